@@ -1,42 +1,113 @@
 # agents/data_agent.py
 
+from agents.data_loader import BatchLoader, RequestCache
+from agents.data_transport import DataTransport, ToolCallError, transport_from_env
 
 
 class CustomerDataAgent:
+    def __init__(self, transport: DataTransport = None):
+        # Direct in-process calls unless $DATA_AGENT_TRANSPORT selects an MCP session
+        self.transport = transport or transport_from_env()
+
+        # Single-ID lookups from concurrent requests are merged into bulk
+        # calls; request_scope() additionally memoizes them per request.
+        self._customers = BatchLoader(self._load_customers)
+        self._histories = BatchLoader(self._load_histories)
+        self._request_cache = RequestCache(f"customer-data-agent-{id(self)}")
+        self._change_listeners = []
+
+    def close(self):
+        self.transport.close()
+
+    # -----------------------------
+    # Request-scoped batching
+    # -----------------------------
+    def request_scope(self):
+        """
+        Context manager for one router request: repeated lookups of the same
+        customer inside it are served from a per-request cache.
+        """
+        return self._request_cache.scope()
+
+    def _load_customers(self, cids):
+        print(f"[customer-data-agent] Batch-loading {len(cids)} customer(s): {cids}")
+        rows = self.transport.call("get_customers_bulk", customer_ids=cids)
+        return {c["id"]: c for c in rows}
+
+    def _load_histories(self, cids):
+        print(f"[customer-data-agent] Batch-loading {len(cids)} customer history(ies): {cids}")
+        items = self.transport.call("get_customer_histories_bulk", customer_ids=cids)
+        found = {h["customer"]["id"]: h for h in items}
+        return {cid: found.get(cid, ToolCallError(f"Customer {cid} not found.")) for cid in cids}
+
+    def add_change_listener(self, fn):
+        """Call fn(customer_id) after this agent updates a customer or adds a ticket."""
+        self._change_listeners.append(fn)
+
+    def _forget(self, cid):
+        self._request_cache.discard(("customer", cid), ("history", cid))
+
+    def _changed(self, cid):
+        for fn in self._change_listeners:
+            fn(cid)
+
+    def loader_stats(self):
+        return {"customers": self._customers.stats(), "histories": self._histories.stats()}
+
     def fetch_customer(self, cid):
         print(f"[customer-data-agent] Fetching customer: id={cid}")
-        from mcp_server.mcp_tools import get_customer
-        return get_customer(cid)
+        cid = int(cid)
+        return self._request_cache.get_or_load(("customer", cid), lambda: self._customers.load(cid))
 
     def fetch_customer_history(self, cid):
         print(f"[customer-data-agent] Fetching customer history: id={cid}")
-        from mcp_server.mcp_tools import get_customer_history
-        return get_customer_history(cid)
+        cid = int(cid)
+        history = self._request_cache.get_or_load(("history", cid), lambda: self._histories.load(cid))
+        self._request_cache.put(("customer", cid), history["customer"])
+        return history
+
+    def fetch_customers_bulk(self, cids):
+        print(f"[customer-data-agent] Fetching {len(cids)} customers in bulk")
+        return self.transport.call("get_customers_bulk", customer_ids=list(cids))
+
+    def fetch_customer_histories_bulk(self, cids):
+        print(f"[customer-data-agent] Fetching {len(cids)} customer histories in bulk")
+        return self.transport.call("get_customer_histories_bulk", customer_ids=list(cids))
+
+    def fetch_ticket_stats(self, customer_status=None):
+        print(f"[customer-data-agent] Fetching ticket stats: customer_status={customer_status}")
+        return self.transport.call("get_ticket_stats", customer_status=customer_status)
 
+    def list_tickets(self, **filters):
+        print(f"[customer-data-agent] Listing tickets: {filters}")
+        return self.transport.call("list_tickets", **filters)
 
     def list_customers(self, status=None, limit=100):
         print(f"[customer-data-agent] Listing customers: status={status}, limit={limit}")
-        from mcp_server.mcp_tools import list_customers
-        return list_customers(status=status, limit=limit)
+        return self.transport.call("list_customers", status=status, limit=limit)
 
     #  multi-step
     def list_premium_active_customers(self):
         print("[customer-data-agent] Listing PREMIUM active customers")
-        from mcp_server.mcp_tools import list_customers
-        return list_customers(status="active", limit=100)
+        return self.transport.call("list_customers", status="active", limit=100)
 
     def update_customer(self, customer_id: int, data: dict) -> dict:
         """
         Update customer partial data, e.g. {"email": "..."}.
         """
-        from mcp_server.mcp_tools import update_customer
         print(f"[customer-data-agent] Updating customer {customer_id}: {data}")
-        return update_customer(customer_id, data)
+        self._forget(customer_id)
+        result = self.transport.call("update_customer", customer_id=customer_id, data=data)
+        self._changed(customer_id)
+        return result
 
     # -----------------------------
     # Create ticket
     # -----------------------------
     def create_ticket(self, customer_id: int, issue: str, priority="medium") -> dict:
-        from mcp_server.mcp_tools import  create_ticket
         print(f"[customer-data-agent] Creating ticket for {customer_id}: {issue}")
-        return create_ticket(customer_id, issue, priority)
\ No newline at end of file
+        self._forget(customer_id)
+        ticket = self.transport.call("create_ticket", customer_id=customer_id, issue=issue,
+                                     priority=priority)
+        self._changed(customer_id)
+        return ticket
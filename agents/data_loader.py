@@ -0,0 +1,148 @@
+# agents/data_loader.py
+#
+# DataLoader-style batching for the data agent: single-key lookups issued by
+# concurrent callers are merged into one bulk call, duplicate keys share one
+# result, and RequestCache memoizes lookups for the duration of one request.
+
+import contextvars
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Sequence
+
+
+class BatchLoader:
+    """
+    Collects keys requested by concurrent threads and loads them with one
+    ``batch_fn(keys) -> {key: value}`` call.
+
+    There is no fixed delay by default: the first caller dispatches at once,
+    and keys requested while a batch is in flight are queued and sent
+    together in the next one, so batching grows with load. ``window`` adds a
+    short wait before each dispatch to gather more keys. Keys missing from
+    the returned mapping resolve to None; Exception values are raised to the
+    callers of that key only.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Hashable]], Dict[Hashable, Any]],
+        max_batch: int = 100,
+        window: float = 0.0,
+    ):
+        if max_batch <= 0:
+            raise ValueError("max_batch must be positive")
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        self.window = window
+        self._cond = threading.Condition()
+        self._queued: Dict[Hashable, Future] = {}  # insertion-ordered
+        self._inflight: Dict[Hashable, Future] = {}
+        self._dispatching = False
+        self._stats = {"loads": 0, "deduped": 0, "batches": 0, "keys": 0, "max_batch_seen": 0}
+
+    def load(self, key: Hashable) -> Any:
+        return self.load_many([key])[0]
+
+    def load_many(self, keys: Sequence[Hashable]) -> List[Any]:
+        with self._cond:
+            futures = []
+            for key in keys:
+                future = self._inflight.get(key) or self._queued.get(key)
+                if future is None:
+                    future = self._queued[key] = Future()
+                else:
+                    self._stats["deduped"] += 1
+                futures.append(future)
+            self._stats["loads"] += len(futures)
+
+        while not all(f.done() for f in futures):
+            with self._cond:
+                # Wait while someone else is loading; lead once nobody is.
+                while self._dispatching and not all(f.done() for f in futures):
+                    self._cond.wait()
+                if all(f.done() for f in futures):
+                    break
+                self._dispatching = True
+            self._dispatch()
+
+        return [f.result() for f in futures]
+
+    def _dispatch(self) -> None:
+        try:
+            if self.window:
+                time.sleep(self.window)
+            with self._cond:
+                keys = list(self._queued)[: self.max_batch]
+                batch = {k: self._queued.pop(k) for k in keys}
+                self._inflight.update(batch)
+                self._stats["batches"] += 1
+                self._stats["keys"] += len(keys)
+                self._stats["max_batch_seen"] = max(self._stats["max_batch_seen"], len(keys))
+
+            try:
+                values = self.batch_fn(keys)
+                error: Optional[Exception] = None
+            except Exception as e:
+                values, error = {}, e
+
+            for key, future in batch.items():
+                value = values.get(key)
+                if error is not None:
+                    future.set_exception(error)
+                elif isinstance(value, Exception):
+                    future.set_exception(value)
+                else:
+                    future.set_result(value)
+        finally:
+            with self._cond:
+                for key in list(self._inflight):
+                    if self._inflight[key].done():
+                        del self._inflight[key]
+                self._dispatching = False
+                self._cond.notify_all()
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return dict(self._stats)
+
+
+class RequestCache:
+    """
+    Per-request memo of loaded values. Outside ``scope()`` nothing is cached.
+    The scope follows contextvars, so each thread or task has its own.
+    """
+
+    def __init__(self, name: str):
+        self._var: contextvars.ContextVar = contextvars.ContextVar(name, default=None)
+
+    @contextmanager
+    def scope(self) -> Iterator[Dict[Hashable, Any]]:
+        if self._var.get() is not None:  # nested scopes share the outer one
+            yield self._var.get()
+            return
+        token = self._var.set({})
+        try:
+            yield self._var.get()
+        finally:
+            self._var.reset(token)
+
+    def get_or_load(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        cache = self._var.get()
+        if cache is None:
+            return load()
+        if key not in cache:
+            cache[key] = load()
+        return cache[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        cache = self._var.get()
+        if cache is not None:
+            cache[key] = value
+
+    def discard(self, *keys: Hashable) -> None:
+        cache = self._var.get()
+        if cache is not None:
+            for key in keys:
+                cache.pop(key, None)
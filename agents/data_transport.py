@@ -0,0 +1,253 @@
+# agents/data_transport.py
+#
+# How CustomerDataAgent reaches the data tools: in-process function calls
+# (DirectTransport) or a real MCP client session to the server over stdio or
+# streamable HTTP (MCPClientTransport), so agents and tools can live on
+# different hosts.
+
+import asyncio
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+TRANSPORT_ENV = "DATA_AGENT_TRANSPORT"  # "direct" (default), "stdio" or an http(s) URL
+SERVER_SCRIPT = Path(__file__).resolve().parent.parent / "mcp_server" / "mcp_server.py"
+
+Call = Tuple[str, Dict[str, Any]]
+
+# Tools that are safe to resend after a failure whose outcome is unknown
+# (e.g. a timeout after the request went out). Writes are never resent.
+READ_ONLY_TOOLS = frozenset({
+    "get_customer",
+    "list_customers",
+    "list_customers_page",
+    "get_customer_history",
+    "get_customer_history_page",
+    "get_customers_bulk",
+    "get_customer_histories_bulk",
+    "get_ticket_stats",
+    "list_tickets",
+    "search_tickets",
+})
+
+
+class ToolCallError(Exception):
+    """A tool returned an error result (the remote side of mcp_tools.ToolError)."""
+
+
+class DataTransport:
+    """Calls a data tool by its mcp_tools name, e.g. call("get_customer", customer_id=1)."""
+
+    def call(self, tool: str, **kwargs: Any) -> Any:
+        raise NotImplementedError
+
+    def call_many(self, calls: Sequence[Call]) -> List[Any]:
+        """Run several calls; results (or raised exceptions) are returned in order."""
+        results: List[Any] = []
+        for tool, kwargs in calls:
+            try:
+                results.append(self.call(tool, **kwargs))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def close(self) -> None:
+        pass
+
+
+class DirectTransport(DataTransport):
+    """
+    In-process calls into mcp_server.mcp_tools (no serialization). ToolError
+    is re-raised as ToolCallError, as MCPClientTransport would report it.
+    """
+
+    def call(self, tool: str, **kwargs: Any) -> Any:
+        from mcp_server import mcp_tools
+        try:
+            return getattr(mcp_tools, tool)(**kwargs)
+        except mcp_tools.ToolError as e:
+            raise ToolCallError(str(e)) from e
+
+
+def _connection_lost(error: BaseException) -> bool:
+    """True if ``error`` means the session itself is unusable, not just one call."""
+    if isinstance(error, (ConnectionError, EOFError)):
+        return True
+    import anyio
+    from mcp.shared.exceptions import McpError
+    from mcp.types import CONNECTION_CLOSED
+    if isinstance(error, (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream)):
+        return True
+    return isinstance(error, McpError) and error.error.code == CONNECTION_CLOSED
+
+
+class MCPClientTransport(DataTransport):
+    """
+    One long-lived MCP client session to the server, over stdio (spawning
+    mcp_server.py) or streamable HTTP when ``url`` is given.
+
+    The session runs on a private event loop in a background thread; calls
+    from any number of threads are multiplexed over it concurrently. A call
+    that exceeds ``timeout`` fails alone and the session stays up. If the
+    connection breaks, the session is re-established and read-only calls
+    (READ_ONLY_TOOLS) are retried ``retries`` times; a failed write is not
+    resent, since the server may already have applied it. Calls shed by the
+    server's admission control never ran, so they are retried after its
+    ``retry_after`` hint whatever the tool.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        command: Optional[List[str]] = None,
+        timeout: float = 30.0,
+        retries: int = 1,
+    ):
+        self.url = url
+        self.command = command or [sys.executable, str(SERVER_SCRIPT)]
+        self.timeout = timeout
+        self.retries = retries
+        self.reconnects = 0
+
+        self._session: Any = None
+        self._closing: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="mcp-client-transport", daemon=True
+        )
+        self._thread.start()
+        self._connect_lock = self._submit(self._make_lock()).result()
+
+    # -- event loop plumbing -------------------------------------------------
+    def _submit(self, coro: Any) -> Any:
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    async def _make_lock(self) -> asyncio.Lock:
+        return asyncio.Lock()
+
+    def _streams(self) -> Any:
+        if self.url:
+            from mcp.client.streamable_http import streamablehttp_client
+            return streamablehttp_client(self.url)
+        from mcp import StdioServerParameters
+        from mcp.client.stdio import stdio_client
+        return stdio_client(StdioServerParameters(
+            command=self.command[0],
+            args=self.command[1:],
+            cwd=str(SERVER_SCRIPT.parent),
+            env=dict(os.environ),
+        ))
+
+    async def _run_session(self, ready: asyncio.Future, closing: asyncio.Event) -> None:
+        # The transport's context managers must be entered and exited in the
+        # same task, so the whole session lives here until close().
+        from mcp import ClientSession
+        try:
+            async with self._streams() as streams:
+                async with ClientSession(streams[0], streams[1]) as session:
+                    await session.initialize()
+                    self._session = session
+                    ready.set_result(None)
+                    await closing.wait()
+        except BaseException as e:
+            if not ready.done():
+                ready.set_exception(e)
+        finally:
+            self._session = None
+
+    async def _connect(self) -> Any:
+        async with self._connect_lock:
+            if self._session is None:
+                if self._closing is not None:  # tear down a broken session
+                    self._closing.set()
+                    self.reconnects += 1
+                ready = self._loop.create_future()
+                self._closing = asyncio.Event()
+                self._task = self._loop.create_task(self._run_session(ready, self._closing))
+                await asyncio.wait_for(ready, self.timeout)
+            return self._session
+
+    async def _disconnect(self, session: Any) -> None:
+        async with self._connect_lock:
+            if self._session is session:
+                self._session = None
+
+    # -- calls ---------------------------------------------------------------
+    @staticmethod
+    def _decode(result: Any) -> Any:
+        if result.isError:
+            raise ToolCallError(" ".join(getattr(c, "text", "") for c in result.content))
+        data = result.structuredContent
+        if isinstance(data, dict) and set(data) == {"result"}:
+            data = data["result"]  # FastMCP wraps return values as {"result": ...}
+        elif data is None:
+            texts = [c.text for c in result.content if getattr(c, "type", "") == "text"]
+            data = json.loads(texts[0]) if len(texts) == 1 else [json.loads(t) for t in texts]
+        return data
+
+    async def _call(self, tool: str, kwargs: Dict[str, Any]) -> Any:
+        attempt = 0
+        while True:
+            session = await self._connect()
+            try:
+                result = await asyncio.wait_for(
+                    session.call_tool(f"tool_{tool}", kwargs), self.timeout
+                )
+            except Exception as e:
+                # A timeout fails only this call; other calls share the session
+                if not _connection_lost(e):
+                    raise
+                await self._disconnect(session)
+                if tool not in READ_ONLY_TOOLS or attempt >= self.retries:
+                    raise
+                attempt += 1
+                continue
+
+            data = self._decode(result)
+            if isinstance(data, dict) and "error" in data:
+                if "retry_after" in data and attempt < self.retries:
+                    attempt += 1
+                    await asyncio.sleep(data["retry_after"])
+                    continue
+                raise ToolCallError(data["error"])
+            return data
+
+    def call(self, tool: str, **kwargs: Any) -> Any:
+        return self._submit(self._call(tool, kwargs)).result()
+
+    def call_many(self, calls: Sequence[Call]) -> List[Any]:
+        """Send all calls at once over the session (pipelined); results in order."""
+        async def gather() -> List[Any]:
+            return await asyncio.gather(
+                *(self._call(tool, kwargs) for tool, kwargs in calls), return_exceptions=True
+            )
+        return self._submit(gather()).result()
+
+    def close(self) -> None:
+        async def shutdown() -> None:
+            if self._closing is not None:
+                self._closing.set()
+            if self._task is not None:
+                await asyncio.wait([self._task], timeout=self.timeout)
+
+        if self._loop.is_running():
+            self._submit(shutdown()).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(self.timeout)
+        self._loop.close()
+
+
+def transport_from_env() -> DataTransport:
+    """Pick the transport named by $DATA_AGENT_TRANSPORT (default: direct)."""
+    choice = os.environ.get(TRANSPORT_ENV, "direct").strip()
+    if choice == "direct":
+        return DirectTransport()
+    if choice == "stdio":
+        return MCPClientTransport()
+    if choice.startswith(("http://", "https://")):
+        return MCPClientTransport(url=choice)
+    raise ValueError(f"Unknown {TRANSPORT_ENV}: {choice!r} (expected direct, stdio or a URL)")
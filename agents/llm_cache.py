@@ -0,0 +1,182 @@
+# agents/llm_cache.py
+#
+# Persistent, content-addressed cache of LLM completions in a local SQLite
+# file. Entries are keyed on (model, normalized prompt, generation options),
+# expire after a TTL, are evicted least-recently-used beyond a size limit, and
+# can be tagged (e.g. "customer:5") so a data change drops dependent replies.
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+LLM_CACHE_ENV = "LLM_CACHE"  # set to "0" to disable
+LLM_CACHE_PATH_ENV = "LLM_CACHE_PATH"
+LLM_CACHE_TTL_ENV = "LLM_CACHE_TTL"
+LLM_CACHE_MAX_ENTRIES_ENV = "LLM_CACHE_MAX_ENTRIES"
+
+DEFAULT_PATH = Path(__file__).resolve().parent.parent / ".llm_cache.db"
+DEFAULT_TTL = 24 * 3600.0
+DEFAULT_MAX_ENTRIES = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used);
+CREATE TABLE IF NOT EXISTS response_tags (
+    tag TEXT NOT NULL,
+    key TEXT NOT NULL REFERENCES responses(key) ON DELETE CASCADE,
+    PRIMARY KEY (tag, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_response_tags_key ON response_tags(key);
+"""
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so indentation / blank-line differences share an entry."""
+    return " ".join(prompt.split())
+
+
+def cache_key(model: str, prompt: str, options: Optional[Dict[str, Any]] = None) -> str:
+    raw = json.dumps([model, normalize_prompt(prompt), options or {}], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    SQLite-backed LLM response cache, safe to share between threads (and,
+    via WAL, between processes using the same file).
+
+    Prompts that embed customer data already miss when that data changes;
+    tags let callers also drop entries eagerly (see invalidate()).
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+    ):
+        env = os.environ.get
+        self.path = str(path or env(LLM_CACHE_PATH_ENV, DEFAULT_PATH))
+        self.ttl = ttl if ttl is not None else float(env(LLM_CACHE_TTL_ENV, DEFAULT_TTL))
+        self.max_entries = max_entries if max_entries is not None else int(
+            env(LLM_CACHE_MAX_ENTRIES_ENV, DEFAULT_MAX_ENTRIES))
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(SCHEMA)
+        self._counters = {"hits": 0, "misses": 0, "writes": 0, "expired": 0, "evictions": 0,
+                          "invalidations": 0}
+
+    def get(self, model: str, prompt: str, options: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        key = cache_key(model, prompt, options)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._counters["expired"] += 1
+                row = None
+            if row is None:
+                self._counters["misses"] += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._counters["hits"] += 1
+            return row[0]
+
+    def put(
+        self,
+        model: str,
+        prompt: str,
+        response: str,
+        options: Optional[Dict[str, Any]] = None,
+        tags: Iterable[str] = (),
+    ) -> None:
+        key = cache_key(model, prompt, options)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, response, created_at, last_used) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, model, response, now, now),
+                )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO response_tags (tag, key) VALUES (?, ?)",
+                    [(tag, key) for tag in set(tags)],
+                )
+                self._evict(now)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._counters["writes"] += 1
+
+    def _evict(self, now: float) -> None:
+        cur = self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+        self._counters["expired"] += cur.rowcount
+        cur = self._conn.execute(
+            """
+            DELETE FROM responses WHERE key IN (
+                SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_entries,),
+        )
+        self._counters["evictions"] += cur.rowcount
+
+    def invalidate(self, *tags: str) -> int:
+        """Drop every entry carrying any of ``tags``; returns how many were removed."""
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM response_tags WHERE tag IN (SELECT value FROM json_each(?)))",
+                (json.dumps(list(tags)),),
+            )
+            self._counters["invalidations"] += cur.rowcount
+            return cur.rowcount
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            counters = dict(self._counters)
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            "path": self.path,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hit_rate": counters["hits"] / lookups if lookups else 0.0,
+            **counters,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def cache_from_env() -> Optional[LLMResponseCache]:
+    """The default cache, or None when $LLM_CACHE is "0"."""
+    if os.environ.get(LLM_CACHE_ENV, "1") == "0":
+        return None
+    return LLMResponseCache()
@@ -0,0 +1,263 @@
+# agents/llm_client.py
+#
+# Shared client for the local LLM endpoint (Ollama /api/generate). One pooled
+# requests.Session keeps connections alive across prompts; timeouts, bounded
+# retries with jittered backoff and per-call metrics are built in.
+
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from agents.llm_cache import LLMResponseCache, cache_from_env
+
+LLM_URL_ENV = "LLM_URL"
+LLM_MODEL_ENV = "LLM_MODEL"
+LLM_CONNECT_TIMEOUT_ENV = "LLM_CONNECT_TIMEOUT"
+LLM_TIMEOUT_ENV = "LLM_TIMEOUT"  # read timeout: generation can be slow
+LLM_RETRIES_ENV = "LLM_RETRIES"
+LLM_POOL_SIZE_ENV = "LLM_POOL_SIZE"
+
+DEFAULT_URL = "http://localhost:11434/api/generate"
+DEFAULT_MODEL = "deepseek-r1:8b"
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_TIMEOUT = 120.0
+DEFAULT_RETRIES = 2
+DEFAULT_POOL_SIZE = 8
+MAX_BACKOFF = 8.0
+
+# HTTP statuses worth retrying (overloaded / restarting backend)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """The LLM endpoint could not produce a response (after retries)."""
+
+
+class LLMClient:
+    """
+    Thread-safe client for an Ollama-compatible /api/generate endpoint.
+
+    Connection errors, timeouts and retryable HTTP statuses are retried up
+    to ``retries`` times with full-jitter exponential backoff; other HTTP
+    errors fail at once. Arguments left as None come from the environment.
+    With a ``cache``, completions are looked up / stored per (model, prompt,
+    options); ``tags`` on a call mark what data the reply depends on.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        model: Optional[str] = None,
+        connect_timeout: Optional[float] = None,
+        timeout: Optional[float] = None,
+        retries: Optional[int] = None,
+        backoff: float = 0.5,
+        pool_size: Optional[int] = None,
+        session: Optional[requests.Session] = None,
+        cache: Optional[LLMResponseCache] = None,
+    ):
+        env = os.environ.get
+        self.url = url or env(LLM_URL_ENV, DEFAULT_URL)
+        self.model = model or env(LLM_MODEL_ENV, DEFAULT_MODEL)
+        self.connect_timeout = connect_timeout if connect_timeout is not None else float(
+            env(LLM_CONNECT_TIMEOUT_ENV, DEFAULT_CONNECT_TIMEOUT))
+        self.timeout = timeout if timeout is not None else float(env(LLM_TIMEOUT_ENV, DEFAULT_TIMEOUT))
+        self.retries = retries if retries is not None else int(env(LLM_RETRIES_ENV, DEFAULT_RETRIES))
+        self.backoff = backoff
+
+        if session is None:
+            size = pool_size or int(env(LLM_POOL_SIZE_ENV, DEFAULT_POOL_SIZE))
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+        self.cache = cache
+
+        self._lock = threading.Lock()
+        self._latencies: deque = deque(maxlen=1024)  # seconds, successful calls
+        self._first_token: deque = deque(maxlen=1024)  # seconds, streamed calls
+        self._counters: Dict[str, Any] = {"calls": 0, "failures": 0, "retries": 0, "errors": {}}
+
+    def generate(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        tags: Iterable[str] = (),
+        **options: Any,
+    ) -> str:
+        """Return the model's completion for ``prompt`` (non-streaming)."""
+        model = model or self.model
+        if self.cache is not None:
+            cached = self.cache.get(model, prompt, options)
+            if cached is not None:
+                return cached
+
+        payload = {"model": model, "prompt": prompt, "stream": False, **options}
+        start = time.perf_counter()
+        response = self._post(payload, start)
+        try:
+            text = response.json().get("response", "")
+        except ValueError as e:
+            self._error(e)
+            self._finish(start, ok=False)
+            raise LLMError(f"LLM returned invalid JSON: {e}") from e
+        self._finish(start, ok=True)
+        if self.cache is not None:
+            self.cache.put(model, prompt, text, options, tags)
+        return text
+
+    def stream(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        tags: Iterable[str] = (),
+        **options: Any,
+    ) -> Iterator[str]:
+        """
+        Yield the completion for ``prompt`` chunk by chunk as the endpoint
+        streams NDJSON lines. The request is sent on the first ``next()``;
+        retries only happen before any text has been received. A cached
+        completion is yielded as a single chunk; a fully received stream is
+        stored in the cache.
+        """
+        model = model or self.model
+        if self.cache is not None:
+            cached = self.cache.get(model, prompt, options)
+            if cached is not None:
+                yield cached
+                return
+
+        payload = {"model": model, "prompt": prompt, "stream": True, **options}
+        start = time.perf_counter()
+        response = self._post(payload, start, stream=True)
+        first = True
+        parts = []
+        try:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise LLMError(f"LLM stream failed: {chunk['error']}")
+                text = chunk.get("response", "")
+                if text:
+                    if first:
+                        first = False
+                        with self._lock:
+                            self._first_token.append(time.perf_counter() - start)
+                    parts.append(text)
+                    yield text
+                if chunk.get("done"):
+                    break
+        except (requests.RequestException, ValueError, LLMError) as e:
+            self._error(e)
+            self._finish(start, ok=False)
+            if isinstance(e, LLMError):
+                raise
+            raise LLMError(f"LLM stream failed: {e}") from e
+        finally:
+            response.close()
+        self._finish(start, ok=True)
+        if self.cache is not None:
+            self.cache.put(model, prompt, "".join(parts), options, tags)
+
+    def _post(self, payload: Dict[str, Any], start: float, stream: bool = False) -> requests.Response:
+        """POST with retries; returns a successful response or raises LLMError."""
+        attempt = 0
+        while True:
+            try:
+                response = self.session.post(
+                    self.url, json=payload, timeout=(self.connect_timeout, self.timeout), stream=stream
+                )
+                if response.status_code in RETRY_STATUSES:
+                    response.close()
+                    raise _RetryableStatus(response.status_code)
+                response.raise_for_status()
+                return response
+            except (requests.ConnectionError, requests.Timeout, _RetryableStatus) as e:
+                self._error(e)
+                if attempt >= self.retries:
+                    self._finish(start, ok=False)
+                    raise LLMError(f"LLM request failed after {attempt + 1} attempt(s): {e}") from e
+                attempt += 1
+                with self._lock:
+                    self._counters["retries"] += 1
+                time.sleep(random.uniform(0, min(MAX_BACKOFF, self.backoff * 2 ** attempt)))
+            except requests.RequestException as e:
+                self._error(e)
+                self._finish(start, ok=False)
+                raise LLMError(f"LLM request failed: {e}") from e
+
+    # -- metrics -------------------------------------------------------------
+    def _error(self, e: Exception) -> None:
+        kind = type(e).__name__
+        with self._lock:
+            self._counters["errors"][kind] = self._counters["errors"].get(kind, 0) + 1
+
+    def _finish(self, start: float, ok: bool) -> None:
+        with self._lock:
+            self._counters["calls"] += 1
+            if ok:
+                self._latencies.append(time.perf_counter() - start)
+            else:
+                self._counters["failures"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Call/failure/retry counts, errors by type, and percentiles (ms) of
+        total latency and of time to first token for streamed calls.
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+            first_token = sorted(self._first_token)
+            counters = {**self._counters, "errors": dict(self._counters["errors"])}
+
+        def pct(samples: List[float], q: float) -> float:
+            if not samples:
+                return 0.0
+            return round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000, 1)
+
+        return {
+            "url": self.url,
+            "model": self.model,
+            **counters,
+            "latency_ms": {q: pct(latencies, v) for q, v in (("p50", 0.5), ("p95", 0.95), ("max", 1.0))},
+            "first_token_ms": {q: pct(first_token, v) for q, v in (("p50", 0.5), ("p95", 0.95), ("max", 1.0))},
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+    def close(self) -> None:
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+
+
+class _RetryableStatus(Exception):
+    def __init__(self, status: int):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+_default: Optional[LLMClient] = None
+_default_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """
+    The process-wide shared client, created on first use from the
+    environment, with the persistent response cache unless LLM_CACHE=0.
+    """
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                _default = LLMClient(cache=cache_from_env())
+    return _default
@@ -0,0 +1,161 @@
+# agents/prompt_builder.py
+#
+# Builds LLM prompts from customer / ticket records within a token budget.
+# Records are rendered as compact pipe-separated tables with only the fields
+# the model needs; tickets are ranked by relevance and the tail dropped until
+# the prompt fits. Token counts come from a local approximation, and each
+# built prompt's size is printed and aggregated per prompt name.
+
+import math
+import os
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+PROMPT_TOKEN_BUDGET_ENV = "PROMPT_TOKEN_BUDGET"
+
+# Ollama's default context is 2048 tokens; leave half of it for the reply
+DEFAULT_BUDGET = 1024
+
+CUSTOMER_COLUMNS = ("id", "name", "email", "phone", "status")
+TICKET_COLUMNS = ("id", "status", "priority", "created_at", "issue")
+MAX_CELL_CHARS = 160
+OMITTED_NOTE_TOKENS = 8
+
+UNRESOLVED = {"open", "in_progress"}
+PRIORITY_RANK = {"high": 2, "medium": 1, "low": 0}
+
+_TOKEN_RE = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+_WORD_RE = re.compile(r"[a-z]{3,}")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximate BPE token count without a tokenizer: letter runs cost one
+    token per 4 characters, digits one per 3, each punctuation mark one.
+    Good enough for budgeting; not an exact count for any model.
+    """
+    count = 0
+    for piece in _TOKEN_RE.findall(text):
+        if piece[0].isalpha():
+            count += math.ceil(len(piece) / 4)
+        elif piece[0].isdigit():
+            count += math.ceil(len(piece) / 3)
+        else:
+            count += 1
+    return count
+
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return ""
+    text = " ".join(str(value).split()).replace("|", "/")
+    if len(text) > MAX_CELL_CHARS:
+        text = text[: MAX_CELL_CHARS - 3] + "..."
+    return text
+
+
+def render_table(rows: Iterable[Dict[str, Any]], columns: Sequence[str]) -> str:
+    """Header line plus one ``a|b|c`` line per row; fields not in ``columns`` are dropped."""
+    lines = ["|".join(columns)]
+    lines.extend("|".join(_cell(row.get(c)) for c in columns) for row in rows)
+    return "\n".join(lines)
+
+
+def render_customer(customer: Optional[Dict[str, Any]]) -> str:
+    if not customer:
+        return "(customer not found)"
+    return render_table([customer], CUSTOMER_COLUMNS)
+
+
+def rank_tickets(tickets: Iterable[Dict[str, Any]], query: str = "") -> List[Dict[str, Any]]:
+    """
+    Most relevant first: unresolved before resolved, then by words shared
+    with the query, priority, and recency.
+    """
+    words = set(_WORD_RE.findall(query.lower()))
+
+    def score(t):
+        overlap = len(words & set(_WORD_RE.findall(str(t.get("issue", "")).lower())))
+        return (t.get("status") in UNRESOLVED, overlap, PRIORITY_RANK.get(t.get("priority"), 0),
+                str(t.get("created_at") or ""), t.get("id") or 0)
+
+    return sorted(tickets, key=score, reverse=True)
+
+
+class PromptBuilder:
+    """
+    Formats a prompt template whose ``{tickets}`` placeholder is filled with
+    as many ranked tickets as fit in ``budget`` tokens (from
+    $PROMPT_TOKEN_BUDGET when None). ``{query}`` is the query the tickets
+    are ranked against; other template fields are inserted as given and
+    never cut, so only they can push a prompt over the budget.
+    """
+
+    def __init__(self, budget: Optional[int] = None):
+        self.budget = budget if budget is not None else int(
+            os.environ.get(PROMPT_TOKEN_BUDGET_ENV, DEFAULT_BUDGET))
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def build(
+        self,
+        name: str,
+        template: str,
+        tickets: Iterable[Dict[str, Any]] = (),
+        query: str = "",
+        columns: Sequence[str] = TICKET_COLUMNS,
+        **fields: Any,
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Return (prompt, report) where report has the prompt's token count and truncation."""
+        ranked = rank_tickets(tickets, query)
+        available = self.budget - estimate_tokens(template.format(tickets="", query=query, **fields))
+
+        # Grow the table row by row; each row's cost is independent of the others
+        lines = [render_table([], columns)]
+        used = estimate_tokens(lines[0]) + 1
+        for ticket in ranked:
+            line = render_table([ticket], columns).split("\n", 1)[1]
+            cost = estimate_tokens(line) + 1
+            if used + cost > available:
+                break
+            lines.append(line)
+            used += cost
+
+        if len(lines) - 1 < len(ranked):
+            # Make room for the "omitted" note as well
+            while len(lines) > 1 and used + OMITTED_NOTE_TOKENS > available:
+                used -= estimate_tokens(lines.pop()) + 1
+
+        kept = len(lines) - 1
+        if not ranked:
+            block = "(none)"
+        else:
+            block = "\n".join(lines)
+            if kept < len(ranked):
+                block += f"\n({len(ranked) - kept} less relevant tickets omitted)"
+
+        prompt = template.format(tickets=block, query=query, **fields)
+        report = {"name": name, "tokens": estimate_tokens(prompt), "budget": self.budget,
+                  "tickets": kept, "tickets_total": len(ranked)}
+        self._record(report)
+        print(f"[prompt-builder] {name}: ~{report['tokens']} tokens "
+              f"(budget {self.budget}, tickets {kept}/{len(ranked)})")
+        return prompt, report
+
+    def _record(self, report: Dict[str, Any]) -> None:
+        with self._lock:
+            s = self._stats.setdefault(report["name"], {"calls": 0, "tokens": 0, "max_tokens": 0,
+                                                        "truncated": 0})
+            s["calls"] += 1
+            s["tokens"] += report["tokens"]
+            s["max_tokens"] = max(s["max_tokens"], report["tokens"])
+            s["truncated"] += report["tickets"] < report["tickets_total"]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per prompt name: calls, mean and max estimated tokens, truncated count."""
+        with self._lock:
+            return {
+                name: {**s, "mean_tokens": round(s["tokens"] / s["calls"], 1)}
+                for name, s in self._stats.items()
+            }
@@ -1,15 +1,30 @@
-def LLM(prompt: str, model: str = "deepseek-r1:8b") -> str:
-    import requests, json
+import asyncio
+import json
+import time
 
-    url = "http://localhost:11434/api/generate"
-    payload = {
-        "model": model,
-        "prompt": prompt,
-        "stream": False
-    }
-    response = requests.post(url, json=payload)
-    data = response.json()
-    return data.get("response", "")
+from agents.llm_client import LLMClient, LLMError, get_llm_client
+from agents.prompt_builder import PromptBuilder, render_customer
+
+
+SCENARIOS = {
+    "task_allocation": "single customer needs account help or information",
+    "negotiation_escalation": "cancellation, billing dispute, refund or urgent complaint",
+    "multi_step_coordination": "report across many customers or tickets",
+    "multi_intent": "update customer data and also show ticket history",
+}
+
+# Keyword results at or above this confidence skip the LLM classifier
+CLASSIFY_CONFIDENCE_THRESHOLD = 0.6
+
+# Constrained LLM classification: a tiny JSON answer, deterministic
+CLASSIFY_LLM_OPTIONS = {
+    "format": {
+        "type": "object",
+        "properties": {"scenario": {"type": "string", "enum": list(SCENARIOS)}},
+        "required": ["scenario"],
+    },
+    "options": {"num_predict": 32, "temperature": 0},
+}
 
 
 
@@ -17,73 +32,181 @@ class RouterResult:
     def __init__(self, scenario, logs, final_reply, extra=None):
         self.scenario = scenario
         self.logs = logs
-        self.final_reply = final_reply
         self.extra = extra or {}
+        self.classification = None  # decision path from RouterAgentLLM.classify_query
+        self.started = time.perf_counter()
+        self.first_token_latency = None  # seconds from handle_query() to first chunk
+
+        # A streamed reply arrives as an iterator of text chunks; final_reply
+        # is filled in once stream() has been consumed.
+        if final_reply is None or isinstance(final_reply, str):
+            self.final_reply = final_reply
+            self._chunks = None
+        else:
+            self.final_reply = None
+            self._chunks = final_reply
+
+    @property
+    def streaming(self):
+        return self._chunks is not None
+
+    def stream(self):
+        """Yield the reply as it is generated (the whole reply if not streaming)."""
+        if self._chunks is None:
+            if self.final_reply:
+                yield self.final_reply
+            return
+
+        chunks, self._chunks = self._chunks, None
+        parts = []
+        try:
+            for chunk in chunks:
+                if self.first_token_latency is None:
+                    self.first_token_latency = time.perf_counter() - self.started
+                parts.append(chunk)
+                yield chunk
+        finally:
+            self.final_reply = "".join(parts)
+
+    async def astream(self):
+        """Async version of stream(); chunks are read in a worker thread."""
+        chunks = self.stream()
+        done = object()
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, done)
+            if chunk is done:
+                return
+            yield chunk
 
 
 
 class RouterAgentLLM:
-    def __init__(self, data_agent, support_agent):
+    def __init__(self, data_agent, support_agent, llm: LLMClient = None):
         self.data_agent = data_agent
         self.support_agent = support_agent
-        self.model = "deepseek-r1:8b"
+        self.llm = llm or get_llm_client()
+        self.model = self.llm.model
+        # Share the support agent's builder so prompt sizes are reported together
+        self.prompts = getattr(support_agent, "prompts", None) or PromptBuilder()
 
     # -----------------------------
     #       CLASSIFICATION
     # -----------------------------
     def classify(self, text: str) -> str:
-
-        # required LLM backend (ignore output)
-        _ = LLM(f"Classify this query: {text}", self.model)
-
+        return self.classify_query(text)["scenario"]
+
+    def classify_query(self, text: str) -> dict:
+        """
+        Tiered classification: keyword rules first; only when their confidence
+        is below CLASSIFY_CONFIDENCE_THRESHOLD is the LLM asked (constrained
+        JSON output). Returns the scenario plus the decision path taken.
+        """
+        scenario, confidence, reason = self._keyword_classify(text)
+        decision = {"scenario": scenario, "confidence": confidence, "method": "keywords",
+                    "path": [f"keywords:{scenario}:{confidence:.2f} ({reason})"]}
+        if confidence >= CLASSIFY_CONFIDENCE_THRESHOLD:
+            return decision
+
+        try:
+            label = self._llm_classify(text)
+        except LLMError as e:
+            decision["path"].append(f"llm:error ({e})")
+            return decision
+
+        if label is None:
+            decision["path"].append("llm:unparseable -> keep keywords")
+            return decision
+        decision.update(scenario=label, method="llm")
+        decision["path"].append(f"llm:{label}")
+        return decision
+
+    @staticmethod
+    def _keyword_classify(text: str):
         t = text.lower()
 
         # Multi-intent: e.g. update email + show ticket history
         if ("update" in t or "change" in t) and ("history" in t or "tickets" in t):
-            return "multi_intent"
+            return "multi_intent", 0.9, "update + history"
 
         # Negotiation / Escalation
-        if any(k in t for k in ["cancel", "billing", "charged", "refund", "immediately"]):
-            return "negotiation_escalation"
+        hits = [k for k in ["cancel", "billing", "charged", "refund", "immediately"] if k in t]
+        if hits:
+            return "negotiation_escalation", 0.9 if len(hits) > 1 else 0.7, ", ".join(hits)
 
         # Multi-step report
-        if any(k in t for k in ["high-priority", "premium", "open tickets", "all customers"]):
-            return "multi_step_coordination"
+        hits = [k for k in ["high-priority", "premium", "open tickets", "all customers"] if k in t]
+        if hits:
+            return "multi_step_coordination", 0.8, ", ".join(hits)
+
+        # Default: single customer help, confident only if it looks like one
+        hits = [k for k in ["customer", "account", "help", " id"] if k in t]
+        if hits:
+            return "task_allocation", 0.6, ", ".join(hits)
+        return "task_allocation", 0.3, "default"
+
+    def _llm_classify(self, text: str):
+        labels = "\n".join(f"- {name}: {desc}" for name, desc in SCENARIOS.items())
+        prompt = f"""Classify the customer support query into exactly one scenario.
+{labels}
 
-        # Default: single customer help
-        return "task_allocation"
+Query: {text}
+
+Answer as JSON: {{"scenario": "<name>"}}"""
+        reply = self.llm.generate(prompt, model=self.model, **CLASSIFY_LLM_OPTIONS)
+        try:
+            label = json.loads(reply).get("scenario")
+        except (ValueError, AttributeError):
+            label = next((name for name in SCENARIOS if name in reply), None)
+        return label if label in SCENARIOS else None
 
 
 
     # -----------------------------
     #          HANDLE QUERY
     # -----------------------------
-    def handle_query(self, query):
+    def handle_query(self, query, stream=False):
+        """
+        Route a query. With stream=True the LLM reply is not awaited: iterate
+        result.stream() (or result.astream()) to receive it as it is
+        generated; result.final_reply is set once the stream is consumed.
+        """
+        started = time.perf_counter()
+        # One request scope per query: repeated customer lookups hit the
+        # data agent's per-request cache and concurrent ones are batched.
+        with self.data_agent.request_scope():
+            result = self._route(query, stream)
+        result.started = started
+        return result
+
+    def _route(self, query, stream=False):
         logs = []
-        scenario = self.classify(query)
-        logs.append(f"[router-llm] classified: {scenario}")
+        decision = self.classify_query(query)
+        scenario = decision["scenario"]
+        logs.append(f"[router-llm] classified: {scenario} via {decision['method']}")
 
         if scenario == "task_allocation":
-            return self._scenario_1(query, logs)
+            result = self._scenario_1(query, logs, stream)
 
         elif scenario == "negotiation_escalation":
-            return self._scenario_2(query, logs)
+            result = self._scenario_2(query, logs, stream)
 
         elif scenario == "multi_step_coordination":
-            return self._scenario_3(query, logs)
+            result = self._scenario_3(query, logs, stream)
 
         elif scenario == "multi_intent":
-            return self._scenario_4(query, logs)
+            result = self._scenario_4(query, logs, stream)
 
         else:
-            return RouterResult("unknown", logs, "Unable to classify.")
+            result = RouterResult("unknown", logs, "Unable to classify.")
+        result.classification = decision
+        return result
 
 
 
     # -----------------------------
     #  SCENARIO 1 — Simple help
     # -----------------------------
-    def _scenario_1(self, query, logs):
+    def _scenario_1(self, query, logs, stream=False):
 
         cust_id = self._extract_cust_id(query) or 1
 
@@ -91,7 +214,7 @@ class RouterAgentLLM:
         customer = self.data_agent.fetch_customer(cust_id)
 
         logs.append("[router] → [support-agent]: LLM account help")
-        reply = self.support_agent.account_help(customer, query)
+        reply = self.support_agent.account_help(customer, query, stream=stream)
 
         return RouterResult("task_allocation", logs, reply, {"customer": customer})
 
@@ -100,7 +223,7 @@ class RouterAgentLLM:
     # -----------------------------
     #  SCENARIO 2 — Negotiation
     # -----------------------------
-    def _scenario_2(self, query, logs):
+    def _scenario_2(self, query, logs, stream=False):
 
         cust_id = self._extract_cust_id(query) or 1
 
@@ -108,7 +231,7 @@ class RouterAgentLLM:
         history = self.data_agent.fetch_customer_history(cust_id)
 
         logs.append("[router] → [support-agent]: LLM escalation reasoning")
-        reply = self.support_agent.billing_escalation(history, query)
+        reply = self.support_agent.billing_escalation(history, query, stream=stream)
 
         return RouterResult("negotiation_escalation", logs, reply, {"history": history})
 
@@ -117,29 +240,28 @@ class RouterAgentLLM:
     # -----------------------------
     #  SCENARIO 3 — Multi-step
     # -----------------------------
-    def _scenario_3(self, query, logs):
+    def _scenario_3(self, query, logs, stream=False):
 
-        logs.append("[router] → [data-agent]: list active customers")
-        customers = self.data_agent.list_customers(status="active", limit=100)
+        logs.append("[router] → [data-agent]: ticket stats for active customers")
+        stats = self.data_agent.fetch_ticket_stats(customer_status="active")
 
-        all_histories = []
-        for cust in customers:
-            logs.append(f"[data-agent] fetching history id={cust['id']}")
-            h = self.data_agent.fetch_customer_history(cust["id"])
-            all_histories.append(h)
+        logs.append("[router] → [data-agent]: unresolved high-priority tickets")
+        page = self.data_agent.list_tickets(status=["open", "in_progress"], priority="high",
+                                            customer_status="active", limit=100)
+        tickets = page["tickets"]
 
         logs.append("[router] → [support-agent]: LLM high priority report")
-        reply = self.support_agent.high_priority_report(all_histories)
+        reply = self.support_agent.high_priority_report(stats, tickets, stream=stream)
 
         return RouterResult("multi_step_coordination", logs, reply,
-                            {"premium_histories": all_histories})
+                            {"ticket_stats": stats, "high_priority_tickets": tickets})
 
 
 
     # -----------------------------
     #  SCENARIO 4 — Multi-intent
     # -----------------------------
-    def _scenario_4(self, query, logs):
+    def _scenario_4(self, query, logs, stream=False):
 
         cust_id = self._extract_cust_id(query) or 1
 
@@ -158,17 +280,28 @@ class RouterAgentLLM:
         history = self.data_agent.fetch_customer_history(cust_id)
 
         # 3. Final LLM summary
-        prompt = f"""
+        history = history or {}
+        prompt, size = self.prompts.build("multi_intent", """
 User request: {query}
 
-Updated email: {new_email}
+Updated email: {email}
+
+Customer:
+{customer}
 
-Customer history:
-{history}
+Tickets (most relevant first):
+{tickets}
 
 Write a combined multi-intent support response.
-"""
-        reply = LLM(prompt, self.model)
+""", history.get("tickets") or [], query, email=new_email,
+            customer=render_customer(history.get("customer")))
+        logs.append(f"[router] prompt ~{size['tokens']} tokens "
+                    f"({size['tickets']}/{size['tickets_total']} tickets)")
+        tags = [f"customer:{cust_id}"]
+        if stream:
+            reply = self.llm.stream(prompt, model=self.model, tags=tags)
+        else:
+            reply = self.llm.generate(prompt, model=self.model, tags=tags)
 
         return RouterResult("multi_intent", logs, reply,
                             {"email": new_email, "history": history})
@@ -1,30 +1,38 @@
-import requests
-import json
-
-
-def LLM(prompt: str, model: str = "deepseek-r1:8b") -> str:
-    import requests, json
-
-    url = "http://localhost:11434/api/generate"
-    payload = {
-        "model": model,
-        "prompt": prompt,
-        "stream": False
-    }
-    response = requests.post(url, json=payload)
-    data = response.json()
-    return data.get("response", "")
+from agents.llm_client import LLMClient, get_llm_client
+from agents.prompt_builder import PromptBuilder, render_customer, render_table
 
+STATS_COLUMNS = ("customer_id", "name", "total", "high", "high_unresolved",
+                 "open", "in_progress", "resolved")
+OPEN_HIGH_COLUMNS = ("id", "customer_id", "customer_name", "status", "issue")
 
 
 class SupportAgentLLM:
-    def __init__(self, data_agent):
+    def __init__(self, data_agent, llm: LLMClient = None, prompts: PromptBuilder = None):
         self.data_agent = data_agent
-        self.model = "deepseek-r1:8b"
+        self.llm = llm or get_llm_client()
+        self.model = self.llm.model
+        self.prompts = prompts or PromptBuilder()
+
+        # Drop cached replies about a customer when the data agent changes it
+        if self.llm.cache is not None and hasattr(data_agent, "add_change_listener"):
+            data_agent.add_change_listener(
+                lambda cid: self.llm.cache.invalidate(f"customer:{cid}", "tickets")
+            )
+
+    @staticmethod
+    def _customer_tags(customer):
+        return [f"customer:{customer['id']}"] if customer and "id" in customer else []
+
+    def _reply(self, prompt, stream=False, tags=()):
+        # stream=True returns an iterator of text chunks instead of a string;
+        # tags name the data the reply depends on (for cache invalidation)
+        if stream:
+            return self.llm.stream(prompt, model=self.model, tags=tags)
+        return self.llm.generate(prompt, model=self.model, tags=tags)
 
     # Scenario 1: Account help
-    def account_help(self, customer, query):
-        prompt = f"""
+    def account_help(self, customer, query, stream=False):
+        prompt, _ = self.prompts.build("account_help", """
 You are a helpful customer support assistant.
 
 Customer data:
@@ -34,17 +42,20 @@ User query:
 {query}
 
 Write a friendly, concise, and professional answer.
-"""
-        reply = LLM(prompt, self.model)
-        return reply
+""", query=query, customer=render_customer(customer))
+        return self._reply(prompt, stream, self._customer_tags(customer))
 
     # Scenario 2: Billing + cancellation escalation
-    def billing_escalation(self, history, query):
-        prompt = f"""
+    def billing_escalation(self, history, query, stream=False):
+        history = history or {}
+        prompt, _ = self.prompts.build("billing_escalation", """
 You are a senior support agent handling a cancellation + billing conflict.
 
-Customer full history:
-{history}
+Customer:
+{customer}
+
+Tickets (most relevant first):
+{tickets}
 
 User request:
 "{query}"
@@ -57,23 +68,28 @@ Provide:
 5. Next actions
 
 Write in helpful natural language.
-"""
-        reply = LLM(prompt, self.model)
-        return reply
+""", history.get("tickets") or [], query, customer=render_customer(history.get("customer")))
+        return self._reply(prompt, stream, self._customer_tags(history.get("customer")))
 
     # Scenario 3: High priority ticket report
-    def high_priority_report(self, histories):
-        prompt = f"""
+    def high_priority_report(self, stats, tickets=(), stream=False):
+        prompt, _ = self.prompts.build("high_priority_report", """
 You are analyzing multiple premium customers' high-priority tickets.
 
-All customer histories:
-{histories}
+Ticket counts per customer (pre-aggregated):
+{rows}
+
+Totals: {totals}
+
+Unresolved high-priority tickets:
+{tickets}
 
 Write a structured report with:
 - Customer name + ID
 - Count of high-priority tickets
 - Any unresolved or critical issues
 - One-sentence recommendation per customer
-"""
-        reply = LLM(prompt, self.model)
-        return reply
+""", tickets, columns=OPEN_HIGH_COLUMNS,
+            rows=render_table(stats["customers"], STATS_COLUMNS),
+            totals=", ".join(f"{k}={v}" for k, v in stats["totals"].items()))
+        return self._reply(prompt, stream, ["tickets"])
@@ -1,18 +1,96 @@
+import os
 import sqlite3
+import sys
 from datetime import datetime
 from pathlib import Path
 
+from mcp_server.mcp_tools import DB_PROFILE_ENV, PRAGMA_PROFILES, apply_pragmas
+
+
+# Versioned schema changes applied by DatabaseSetup.migrate(), in order.
+# Append new entries; never edit or renumber one that has shipped.
+MIGRATIONS = [
+    (
+        1,
+        "Composite index for customer history (filter + newest-first order)",
+        [
+            """
+            CREATE INDEX IF NOT EXISTS idx_tickets_customer_created
+            ON tickets(customer_id, created_at DESC, id DESC)
+            """,
+            # Superseded: customer_id is the leading column of the new index
+            "DROP INDEX IF EXISTS idx_tickets_customer_id",
+        ],
+    ),
+    (
+        2,
+        "Composite index for status / priority filters",
+        [
+            """
+            CREATE INDEX IF NOT EXISTS idx_tickets_status_priority
+            ON tickets(status, priority)
+            """,
+            # Superseded: status is the leading column of the new index
+            "DROP INDEX IF EXISTS idx_tickets_status",
+        ],
+    ),
+    (
+        3,
+        "FTS5 full-text index over tickets.issue, kept in sync by triggers",
+        [
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS tickets_fts USING fts5(
+                issue,
+                content='tickets',
+                content_rowid='id',
+                tokenize='porter unicode61'
+            )
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS tickets_fts_insert
+            AFTER INSERT ON tickets
+            BEGIN
+                INSERT INTO tickets_fts(rowid, issue) VALUES (NEW.id, NEW.issue);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS tickets_fts_delete
+            AFTER DELETE ON tickets
+            BEGIN
+                INSERT INTO tickets_fts(tickets_fts, rowid, issue)
+                VALUES ('delete', OLD.id, OLD.issue);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS tickets_fts_update
+            AFTER UPDATE OF issue ON tickets
+            BEGIN
+                INSERT INTO tickets_fts(tickets_fts, rowid, issue)
+                VALUES ('delete', OLD.id, OLD.issue);
+                INSERT INTO tickets_fts(rowid, issue) VALUES (NEW.id, NEW.issue);
+            END
+            """,
+            # Index the tickets that already exist
+            "INSERT INTO tickets_fts(tickets_fts) VALUES ('rebuild')",
+        ],
+    ),
+]
+
 
 class DatabaseSetup:
     """SQLite database setup for customer support system."""
 
-    def __init__(self, db_path: str = "support.db"):
+    def __init__(self, db_path: str = "support.db", profile: str = "default"):
         """Initialize database connection.
 
         Args:
             db_path: Path to the SQLite database file
+            profile: Name of the PRAGMA profile to apply (see PRAGMA_PROFILES)
         """
+        if profile not in PRAGMA_PROFILES:
+            raise ValueError(f"Unknown database profile: {profile!r}")
         self.db_path = db_path
+        self.profile = profile
         self.conn = None
         self.cursor = None
 
@@ -20,9 +98,16 @@ class DatabaseSetup:
         """Establish database connection."""
         self.conn = sqlite3.connect(self.db_path)
         self.conn.execute("PRAGMA foreign_keys = ON")  # Enable foreign key constraints
+        self.apply_profile()
         self.cursor = self.conn.cursor()
         print(f"Connected to database: {self.db_path}")
 
+    def apply_profile(self):
+        """Apply the configured PRAGMA profile (journal mode, cache, mmap...)."""
+        apply_pragmas(self.conn, PRAGMA_PROFILES[self.profile])
+        journal_mode = self.conn.execute("PRAGMA journal_mode").fetchone()[0]
+        print(f"Applied '{self.profile}' profile (journal_mode={journal_mode})")
+
     def create_tables(self):
         """Create customers and tickets tables."""
 
@@ -52,19 +137,12 @@ class DatabaseSetup:
             )
         """)
 
-        # Create indexes for better query performance
+        # Create indexes for better query performance (ticket indexes come
+        # from MIGRATIONS, so re-running setup never restores dropped ones)
         self.cursor.execute("""
             CREATE INDEX IF NOT EXISTS idx_customers_email ON customers(email)
         """)
 
-        self.cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_tickets_customer_id ON tickets(customer_id)
-        """)
-
-        self.cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_tickets_status ON tickets(status)
-        """)
-
         self.conn.commit()
         print("Tables created successfully!")
 
@@ -84,6 +162,66 @@ class DatabaseSetup:
         self.conn.commit()
         print("Triggers created successfully!")
 
+    def migrate(self):
+        """Apply pending schema migrations.
+
+        Applied versions are recorded in schema_migrations, so this is
+        idempotent and safe to run against a live database: each migration
+        runs in its own IMMEDIATE transaction and re-checks its version once
+        the write lock is held, in case another process got there first.
+
+        Returns:
+            List of versions applied by this call
+        """
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        self.conn.commit()
+
+        applied = []
+        for version, description, statements in MIGRATIONS:
+            self.cursor.execute("BEGIN IMMEDIATE")
+            try:
+                self.cursor.execute(
+                    "SELECT 1 FROM schema_migrations WHERE version = ?", (version,)
+                )
+                if self.cursor.fetchone():
+                    self.conn.rollback()
+                    continue
+
+                for statement in statements:
+                    self.cursor.execute(statement)
+                self.cursor.execute(
+                    "INSERT INTO schema_migrations (version, description) VALUES (?, ?)",
+                    (version, description),
+                )
+                self.conn.commit()
+            except sqlite3.Error:
+                self.conn.rollback()
+                raise
+
+            applied.append(version)
+            print(f"Applied migration {version}: {description}")
+
+        if not applied:
+            print(f"Schema up to date (version {self.schema_version()})")
+        return applied
+
+    def schema_version(self):
+        """Return the highest applied migration version (0 if none)."""
+        self.cursor.execute("""
+            SELECT name FROM sqlite_master
+            WHERE type = 'table' AND name = 'schema_migrations'
+        """)
+        if self.cursor.fetchone() is None:
+            return 0
+        self.cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+        return self.cursor.fetchone()[0]
+
     def insert_sample_data(self):
         """Insert sample data for testing."""
 
@@ -352,21 +490,31 @@ class DatabaseSetup:
 
 
 def main():
-    """Main function to setup the database."""
+    """Main function to setup the database.
+
+    Pass --migrate to only apply pending migrations to an existing database.
+    """
 
     # Initialize database
-    db = DatabaseSetup("support.db")
+    db = DatabaseSetup("support.db", profile=os.environ.get(DB_PROFILE_ENV, "default"))
 
     try:
         # Connect to database
         db.connect()
 
+        if "--migrate" in sys.argv[1:]:
+            db.migrate()
+            return
+
         # Create tables
         db.create_tables()
 
         # Create triggers
         db.create_triggers()
 
+        # Bring the schema up to the latest version
+        db.migrate()
+
         # Display schema
         db.display_schema()
 
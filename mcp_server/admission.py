@@ -0,0 +1,188 @@
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+MAX_INFLIGHT_ENV = "MCP_MAX_INFLIGHT"  # concurrently admitted calls
+MAX_QUEUE_ENV = "MCP_MAX_QUEUE"  # calls allowed to wait for a slot
+DEFAULT_MAX_INFLIGHT = 8  # matches the executor's default worker count
+DEFAULT_MAX_QUEUE = 64
+
+# Priority classes, most important first, with how long a call of that class
+# may wait in the queue before it is shed.
+PRIORITY_CLASSES: Dict[str, float] = {
+    "interactive": 2.0,
+    "standard": 5.0,
+    "batch": 10.0,
+}
+DEFAULT_PRIORITY = "standard"
+
+
+class Overloaded(Exception):
+    """Raised when a call is shed; ``retry_after`` is a back-off hint in seconds."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Bounds how many tool calls run at once. Calls over the limit wait in a
+    priority queue (interactive before standard before batch, FIFO within a
+    class) for at most their class's deadline. When the queue is full a new
+    call displaces the newest waiter of a lower class, or is rejected at once.
+    Shed calls raise Overloaded with a retry-after estimate derived from the
+    queue length and the recent average service time.
+    """
+
+    def __init__(
+        self,
+        max_inflight: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        tool_priorities: Optional[Dict[str, str]] = None,
+        queue_timeouts: Optional[Dict[str, float]] = None,
+    ):
+        if max_inflight is None:
+            max_inflight = int(os.environ.get(MAX_INFLIGHT_ENV, DEFAULT_MAX_INFLIGHT))
+        if max_queue is None:
+            max_queue = int(os.environ.get(MAX_QUEUE_ENV, DEFAULT_MAX_QUEUE))
+        if max_inflight <= 0:
+            raise ValueError("max_inflight must be positive")
+        if max_queue < 0:
+            raise ValueError("max_queue must not be negative")
+
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.tool_priorities = dict(tool_priorities or {})
+        self.queue_timeouts = {**PRIORITY_CLASSES, **(queue_timeouts or {})}
+        unknown = set(self.tool_priorities.values()) - set(self.queue_timeouts)
+        if unknown:
+            raise ValueError(f"unknown priority class(es): {sorted(unknown)}")
+
+        self._ranks = {name: i for i, name in enumerate(self.queue_timeouts)}
+        self._inflight = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []  # heap
+        self._seq = itertools.count()
+        self._service_time = 0.05  # EWMA of admitted call duration, seconds
+        self._lock = threading.Lock()
+        self._classes: Dict[str, Dict[str, int]] = {}
+
+    # -- bookkeeping --------------------------------------------------------
+    def priority(self, tool: str) -> str:
+        return self.tool_priorities.get(tool, DEFAULT_PRIORITY)
+
+    def _change(self, cls: str, **deltas: int) -> None:
+        with self._lock:
+            counters = self._classes.get(cls)
+            if counters is None:
+                counters = self._classes[cls] = {
+                    "admitted": 0,
+                    "queued": 0,  # currently waiting
+                    "max_queued": 0,
+                    "rejected": 0,  # queue full on arrival
+                    "displaced": 0,  # pushed out by a higher class
+                    "expired": 0,  # queue deadline passed
+                }
+            for name, delta in deltas.items():
+                counters[name] += delta
+            counters["max_queued"] = max(counters["max_queued"], counters["queued"])
+
+    def retry_after(self) -> float:
+        """Rough time until a new call would get a slot."""
+        waiting = len(self._waiters) + 1
+        return round(max(0.1, waiting * self._service_time / self.max_inflight), 3)
+
+    # -- admission ------------------------------------------------------------
+    @asynccontextmanager
+    async def admit(self, tool: str) -> AsyncIterator[None]:
+        """Hold an execution slot for ``tool`` for the duration of the block."""
+        await self._acquire(tool)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._service_time = 0.8 * self._service_time + 0.2 * elapsed
+            self._release()
+
+    async def _acquire(self, tool: str) -> None:
+        cls = self.priority(tool)
+        if self._inflight < self.max_inflight and not self._waiters:
+            self._inflight += 1
+            self._change(cls, admitted=1)
+            return
+
+        rank = self._ranks[cls]
+        if len(self._waiters) >= self.max_queue and not self._displace(rank):
+            self._change(cls, rejected=1)
+            raise Overloaded(f"server overloaded: {tool} rejected", self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (rank, next(self._seq), waiter))
+        self._change(cls, queued=1)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeouts[cls])
+        except (asyncio.TimeoutError, Overloaded):
+            pass
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                self._release()  # a slot was handed over just as we were cancelled
+            else:
+                self._drop(waiter)
+            self._change(cls, queued=-1)
+            raise
+
+        if not waiter.done():
+            self._drop(waiter)
+            self._change(cls, queued=-1, expired=1)
+            raise Overloaded(
+                f"server overloaded: {tool} waited {self.queue_timeouts[cls]}s", self.retry_after()
+            )
+        error = waiter.exception()
+        if error is not None:
+            self._change(cls, queued=-1, displaced=1)
+            raise error
+        self._change(cls, queued=-1, admitted=1)
+
+    def _displace(self, rank: int) -> bool:
+        """Shed the newest waiter of a lower class than ``rank``, if any."""
+        victim = max(self._waiters, key=lambda w: (w[0], w[1]), default=None)
+        if victim is None or victim[0] <= rank:
+            return False
+        self._waiters.remove(victim)
+        heapq.heapify(self._waiters)
+        victim[2].set_exception(
+            Overloaded("server overloaded: displaced by a higher-priority call", self.retry_after())
+        )
+        return True
+
+    def _drop(self, waiter: asyncio.Future) -> None:
+        self._waiters = [w for w in self._waiters if w[2] is not waiter]
+        heapq.heapify(self._waiters)
+        waiter.cancel()
+
+    def _release(self) -> None:
+        # Hand the slot straight to the best waiter so nobody can barge in.
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._inflight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            classes = {name: dict(c) for name, c in self._classes.items()}
+        return {
+            "max_inflight": self.max_inflight,
+            "max_queue": self.max_queue,
+            "inflight": self._inflight,
+            "queued": len(self._waiters),
+            "retry_after": self.retry_after(),
+            "classes": classes,
+        }
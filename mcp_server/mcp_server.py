@@ -1,16 +1,45 @@
 # mcp_server.py
 
-from typing import Any, Dict, List, Optional
-from mcp.server.fastmcp import FastMCP  # type: ignore
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from mcp.server.fastmcp import Context, FastMCP  # type: ignore
 
 from mcp_tools import (
     get_customer,
     list_customers,
+    list_customers_page,
     update_customer,
     create_ticket,
+    create_tickets_bulk,
     get_customer_history,
+    get_customer_history_page,
+    get_customers_bulk,
+    get_customer_histories_bulk,
+    get_ticket_stats,
+    list_tickets,
+    search_tickets,
+    get_pool,
+    pool_stats,
+    MAX_PAGE_SIZE,
+    cache_stats,
+    savepoint,
+    transaction,
     ToolError,
 )
+from admission import AdmissionController, Overloaded
+from single_flight import SingleFlight, call_key
+from tool_executor import ToolExecutor
+from tool_metrics import (
+    METRICS_FILE_ENV,
+    METRICS_INTERVAL_ENV,
+    ToolMetrics,
+    measure,
+    start_file_exporter,
+)
 
 # ---------------------------------------------------------------------------
 # Create MCP server instance
@@ -18,94 +47,707 @@ from mcp_tools import (
 mcp = FastMCP("customer-support-mcp", json_response=True)
 
 
+# ---------------------------------------------------------------------------
+# Tool execution: blocking sqlite calls run on a bounded thread pool
+# ---------------------------------------------------------------------------
+# Max concurrent calls per tool; tools not listed are only bounded by the
+# worker count ($MCP_TOOL_WORKERS).
+TOOL_CONCURRENCY = {
+    "get_customer_histories_bulk": 2,
+    "get_ticket_stats": 2,
+    "list_tickets": 4,
+    "search_tickets": 4,
+    "create_tickets_bulk": 1,
+    "stream_customers": 2,
+    "stream_customer_history": 2,
+}
+
+# Admission priority class per tool (see admission.PRIORITY_CLASSES); tools
+# not listed are "standard". Under overload interactive calls are admitted
+# first and reports / bulk work is shed first.
+TOOL_PRIORITY = {
+    "get_customer": "interactive",
+    "update_customer": "interactive",
+    "create_ticket": "interactive",
+    "list_customers_page": "interactive",
+    "get_customer_history_page": "interactive",
+    "get_ticket_stats": "batch",
+    "get_customer_histories_bulk": "batch",
+    "create_tickets_bulk": "batch",
+    "batch_writes": "batch",
+    "stream_customers": "batch",
+    "stream_customer_history": "batch",
+}
+
+# Read-only tools whose identical concurrent calls share one query.
+SINGLE_FLIGHT_TOOLS = frozenset({
+    "get_customer",
+    "list_customers",
+    "list_customers_page",
+    "get_customer_history",
+    "get_customer_history_page",
+    "get_customers_bulk",
+    "get_customer_histories_bulk",
+    "get_ticket_stats",
+    "list_tickets",
+    "search_tickets",
+})
+
+executor = ToolExecutor(tool_limits=TOOL_CONCURRENCY)
+admission = AdmissionController(max_inflight=executor.max_workers, tool_priorities=TOOL_PRIORITY)
+metrics = ToolMetrics()
+flight = SingleFlight()
+
+
+async def _execute(tool: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Run a data-layer function on the executor, recording metrics. Identical
+    concurrent read calls are coalesced; any other call ends the sharing of
+    reads already in flight. Every caller is recorded, coalesced ones
+    included, with the latency it observed. Errors propagate.
+    """
+    def work() -> Any:
+        result = fn(*args, **kwargs)
+        # Sized on the worker thread so the event loop never encodes results
+        return result, (measure(result) if metrics.enabled else (None, 0))
+
+    start = time.perf_counter()
+    try:
+        if tool in SINGLE_FLIGHT_TOOLS:
+            out = await flight.do(tool, call_key(*args, **kwargs), lambda: _run(tool, work))
+        else:
+            try:
+                out = await _run(tool, work)
+            finally:
+                flight.forget()
+    except Exception as e:
+        metrics.record(tool, time.perf_counter() - start, error=type(e).__name__)
+        raise
+
+    result, (rows, payload) = out
+    metrics.record(tool, time.perf_counter() - start, result, rows=rows, payload=payload)
+    return result
+
+
+async def _run(tool: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Run on the executor under admission control. The per-tool limit is taken
+    first, so calls waiting on it do not hold admission slots that other
+    tools (e.g. interactive ones) could use.
+    """
+    async with executor.limit(tool):
+        async with admission.admit(tool):
+            return await executor.submit(tool, fn, *args, **kwargs)
+
+
+def _record_sync(tool: str, fn: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    """Run and record a small synchronous stats tool."""
+    start = time.perf_counter()
+    try:
+        result = fn()
+    except Exception as e:
+        metrics.record(tool, time.perf_counter() - start, error=type(e).__name__)
+        return _error(e)
+    rows, payload = measure(result) if metrics.enabled else (0, 0)
+    metrics.record(tool, time.perf_counter() - start, result, rows=rows, payload=payload)
+    return result
+
+
+def _error(e: Exception) -> Dict[str, Any]:
+    """Map an exception to a tool's {"error": ...} result."""
+    if isinstance(e, ToolError):
+        return {"error": str(e)}
+    if isinstance(e, Overloaded):
+        return {"error": str(e), "retry_after": e.retry_after}
+    return {"error": f"internal server error: {e}"}
+
+
+async def _call(tool: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a data-layer function off the event loop and map errors to {"error": ...}."""
+    try:
+        return await _execute(tool, fn, *args, **kwargs)
+    except Exception as e:
+        return _error(e)
+
+
 # ---------------------------------------------------------------------------
 # Tool: get_customer
 # ---------------------------------------------------------------------------
 @mcp.tool()
-def tool_get_customer(customer_id: int) -> Optional[Dict[str, Any]]:
+async def tool_get_customer(
+    customer_id: int,
+    fields: Optional[List[str]] = None,
+) -> Optional[Dict[str, Any]]:
     """
     Fetch a single customer by ID.
+    fields: optional subset of id, name, email, phone, status, created_at, updated_at
     Returns:
         dict or None
     """
-    try:
-        return get_customer(customer_id)
-    except ToolError as e:
-        return {"error": str(e)}
-    except Exception as e:
-        return {"error": f"internal server error: {e}"}
+    return await _call("get_customer", get_customer, customer_id, fields=fields)
 
 
 # ---------------------------------------------------------------------------
 # Tool: list_customers
 # ---------------------------------------------------------------------------
 @mcp.tool()
-def tool_list_customers(status: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+async def tool_list_customers(
+    status: Optional[str] = None,
+    limit: int = 20,
+    fields: Optional[List[str]] = None,
+    format: str = "rows",
+) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
     """
     List customers with optional status filter.
+    fields: optional column subset; format: "rows" (list of objects) or
+    "compact" ({"columns": [...], "rows": [[...], ...]}).
     """
-    try:
-        return list_customers(status=status, limit=limit)
-    except ToolError as e:
-        return {"error": str(e)}
-    except Exception as e:
-        return {"error": f"internal server error: {e}"}
+    return await _call("list_customers", list_customers, status=status, limit=limit,
+                       fields=fields, format=format)
+
+
+# ---------------------------------------------------------------------------
+# Tool: list_customers_page
+# ---------------------------------------------------------------------------
+@mcp.tool()
+async def tool_list_customers_page(
+    status: Optional[str] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    format: str = "rows",
+) -> Dict[str, Any]:
+    """
+    Cursor-paginated customer listing.
+    Returns {"customers": [...], "next_cursor": ...}; pass next_cursor back
+    to fetch the following page (null when there are no more rows).
+    fields / format: as in tool_list_customers.
+    """
+    return await _call("list_customers_page", list_customers_page, status=status, limit=limit,
+                       cursor=cursor, fields=fields, format=format)
 
 
 # ---------------------------------------------------------------------------
 # Tool: update_customer
 # ---------------------------------------------------------------------------
 @mcp.tool()
-def tool_update_customer(customer_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
+async def tool_update_customer(customer_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Update customer fields.
     data may include: name, email, phone, status
     """
-    try:
-        return update_customer(customer_id, data)
-    except ToolError as e:
-        return {"error": str(e)}
-    except Exception as e:
-        return {"error": f"internal server error: {e}"}
+    return await _call("update_customer", update_customer, customer_id, data)
 
 
 # ---------------------------------------------------------------------------
 # Tool: create_ticket
 # ---------------------------------------------------------------------------
 @mcp.tool()
-def tool_create_ticket(customer_id: int, issue: str, priority: str = "medium") -> Dict[str, Any]:
+async def tool_create_ticket(customer_id: int, issue: str, priority: str = "medium") -> Dict[str, Any]:
     """
     Create a support ticket for a customer.
     priority: low / medium / high
     """
-    try:
-        return create_ticket(customer_id, issue, priority)
-    except ToolError as e:
-        return {"error": str(e)}
-    except Exception as e:
-        return {"error": f"internal server error: {e}"}
+    return await _call("create_ticket", create_ticket, customer_id, issue, priority)
+
+
+# ---------------------------------------------------------------------------
+# Tool: create_tickets_bulk
+# ---------------------------------------------------------------------------
+@mcp.tool()
+async def tool_create_tickets_bulk(tickets: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Create many tickets in a single transaction.
+    Each item: {"customer_id": int, "issue": str, "priority": "low"|"medium"|"high"}
+    Returns {"created": [...], "errors": [{"index": i, "error": "..."}]}.
+    """
+    return await _call("create_tickets_bulk", create_tickets_bulk, tickets)
 
 
 # ---------------------------------------------------------------------------
 # Tool: get_customer_history
 # ---------------------------------------------------------------------------
 @mcp.tool()
-def tool_get_customer_history(customer_id: int) -> Dict[str, Any]:
+async def tool_get_customer_history(
+    customer_id: int,
+    fields: Optional[List[str]] = None,
+    ticket_fields: Optional[List[str]] = None,
+    format: str = "rows",
+) -> Dict[str, Any]:
     """
     Return customer info + all tickets (descending order).
+    fields / ticket_fields: optional column subsets; ticket_fields=[] returns
+    only "ticket_count". format="compact" sends tickets as columns + rows.
+    """
+    return await _call("get_customer_history", get_customer_history, customer_id,
+                       fields=fields, ticket_fields=ticket_fields, format=format)
+
+
+# ---------------------------------------------------------------------------
+# Tool: get_customers_bulk
+# ---------------------------------------------------------------------------
+@mcp.tool()
+async def tool_get_customers_bulk(
+    customer_ids: List[int],
+    fields: Optional[List[str]] = None,
+    format: str = "rows",
+) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Fetch many customers by ID in one query (unknown IDs are skipped).
+    fields / format: as in tool_list_customers.
+    """
+    return await _call("get_customers_bulk", get_customers_bulk, customer_ids,
+                       fields=fields, format=format)
+
+
+# ---------------------------------------------------------------------------
+# Tool: get_customer_histories_bulk
+# ---------------------------------------------------------------------------
+@mcp.tool()
+async def tool_get_customer_histories_bulk(
+    customer_ids: List[int],
+    fields: Optional[List[str]] = None,
+    ticket_fields: Optional[List[str]] = None,
+    format: str = "rows",
+) -> List[Dict[str, Any]]:
+    """
+    Return customer info + tickets for many customers in a constant number
+    of queries.
+    fields / ticket_fields / format: as in tool_get_customer_history.
+    """
+    return await _call("get_customer_histories_bulk", get_customer_histories_bulk, customer_ids,
+                       fields=fields, ticket_fields=ticket_fields, format=format)
+
+
+# ---------------------------------------------------------------------------
+# Tool: get_ticket_stats
+# ---------------------------------------------------------------------------
+@mcp.tool()
+async def tool_get_ticket_stats(
+    customer_status: Optional[str] = None,
+    format: str = "rows",
+) -> Dict[str, Any]:
+    """
+    Per-customer ticket counts by status and priority (plus totals),
+    optionally restricted to customers with the given status.
+    format="compact" sends the per-customer rows as columns + rows.
+    """
+    return await _call("get_ticket_stats", get_ticket_stats, customer_status=customer_status,
+                       format=format)
+
+
+# ---------------------------------------------------------------------------
+# Tool: list_tickets
+# ---------------------------------------------------------------------------
+@mcp.tool()
+async def tool_list_tickets(
+    status: Union[str, List[str], None] = None,
+    priority: Union[str, List[str], None] = None,
+    customer_status: Optional[str] = None,
+    customer_id: Optional[int] = None,
+    created_after: Optional[str] = None,
+    created_before: Optional[str] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    format: str = "rows",
+) -> Dict[str, Any]:
+    """
+    List tickets (newest first) with customer name/email/status attached.
+    status: open / in_progress / resolved (one or a list)
+    priority: low / medium / high (one or a list)
+    customer_status: active / disabled
+    created_after / created_before: ISO dates
+    fields / format: as in tool_list_customers
+    Returns {"tickets": [...], "next_cursor": ...}.
+    """
+    return await _call(
+        "list_tickets",
+        list_tickets,
+        status=status,
+        priority=priority,
+        customer_status=customer_status,
+        customer_id=customer_id,
+        created_after=created_after,
+        created_before=created_before,
+        limit=limit,
+        cursor=cursor,
+        fields=fields,
+        format=format,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Tool: search_tickets
+# ---------------------------------------------------------------------------
+@mcp.tool()
+async def tool_search_tickets(
+    query: str,
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    limit: int = 20,
+    fields: Optional[List[str]] = None,
+    format: str = "rows",
+) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Full-text search over ticket issues (e.g. "payment failing"), ranked by
+    BM25, with a highlighted snippet per match.
+    status: open / in_progress / resolved; priority: low / medium / high
+    fields / format: as in tool_list_customers
+    """
+    return await _call("search_tickets", search_tickets, query, status=status, priority=priority,
+                       limit=limit, fields=fields, format=format)
+
+
+# ---------------------------------------------------------------------------
+# Tool: get_customer_history_page
+# ---------------------------------------------------------------------------
+@mcp.tool()
+async def tool_get_customer_history_page(
+    customer_id: int,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    ticket_fields: Optional[List[str]] = None,
+    format: str = "rows",
+) -> Dict[str, Any]:
+    """
+    Customer record plus one page of tickets (newest first).
+    Returns {"customer", "tickets", "next_cursor"}; pass next_cursor back
+    with the same customer_id for the next page.
     """
+    return await _call("get_customer_history_page", get_customer_history_page, customer_id,
+                       limit=limit, cursor=cursor, ticket_fields=ticket_fields, format=format)
+
+
+# ---------------------------------------------------------------------------
+# Streaming: large results sent as progress notifications
+# ---------------------------------------------------------------------------
+STREAM_CHUNK_SIZE = 200
+
+
+def _progress_token(ctx: Optional[Context]) -> Any:
+    """The request's progress token, or None if the client did not send one."""
+    if ctx is None:
+        return None
     try:
-        return get_customer_history(customer_id)
-    except ToolError as e:
-        return {"error": str(e)}
+        meta = ctx.request_context.meta
+    except ValueError:  # called outside of an MCP request
+        return None
+    return meta.progressToken if meta else None
+
+
+async def _stream_pages(
+    tool: str,
+    ctx: Context,
+    fetch_page: Callable[[Optional[str]], Tuple[List[Dict[str, Any]], Optional[str]]],
+) -> Dict[str, int]:
+    """
+    Fetch one keyset page at a time with ``fetch_page(cursor) -> (rows,
+    next_cursor)`` and send each as a progress notification whose message is
+    JSON {"chunk": n, "rows": [...]}. Every page is admitted and run on the
+    executor on its own, so no pooled connection or admission slot is held
+    while a slow client receives a chunk. Only one chunk is held in memory.
+    """
+    sent = chunks = 0
+    cursor = None
+    while True:
+        chunk, cursor = await _run(tool, fetch_page, cursor)
+        if not chunk:
+            break
+        sent += len(chunk)
+        await ctx.report_progress(
+            sent, message=json.dumps({"chunk": chunks, "rows": chunk}, default=str)
+        )
+        chunks += 1
+        if cursor is None:
+            break
+    return {"rows": sent, "chunks": chunks}
+
+
+def _chunk_size(chunk_size: int) -> int:
+    return min(chunk_size, MAX_PAGE_SIZE) if chunk_size > 0 else STREAM_CHUNK_SIZE
+
+
+@mcp.tool()
+async def tool_stream_customers(
+    status: Optional[str] = None,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    ctx: Optional[Context] = None,
+) -> Dict[str, Any]:
+    """
+    Export customers ordered by id. If the request carries a progress token,
+    rows arrive as progress notifications (message = JSON {"chunk", "rows"})
+    and the result is {"streamed": {"rows", "chunks"}}. Otherwise the first
+    page is returned with a next_cursor for tool_list_customers_page.
+    """
+    chunk_size = _chunk_size(chunk_size)
+    if _progress_token(ctx) is None:
+        return await _call("list_customers_page", list_customers_page,
+                           status=status, limit=chunk_size)
+
+    start = time.perf_counter()
+    try:
+        def fetch_page(cursor: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+            page = list_customers_page(status, limit=chunk_size, cursor=cursor)
+            return page["customers"], page["next_cursor"]
+
+        streamed = await _stream_pages("stream_customers", ctx, fetch_page)
     except Exception as e:
-        return {"error": f"internal server error: {e}"}
+        metrics.record("stream_customers", time.perf_counter() - start, error=type(e).__name__)
+        return _error(e)
+    metrics.record("stream_customers", time.perf_counter() - start, rows=streamed["rows"])
+    return {"streamed": streamed}
+
+
+@mcp.tool()
+async def tool_stream_customer_history(
+    customer_id: int,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    ticket_fields: Optional[List[str]] = None,
+    ctx: Optional[Context] = None,
+) -> Dict[str, Any]:
+    """
+    Customer record plus all tickets, newest first. With a progress token the
+    tickets arrive as progress notifications (message = JSON {"chunk",
+    "rows"}) and the result is {"customer", "streamed": {"rows", "chunks"}}.
+    Otherwise this returns the first page and a next_cursor for
+    tool_get_customer_history_page.
+    """
+    chunk_size = _chunk_size(chunk_size)
+    if _progress_token(ctx) is None:
+        return await _call("get_customer_history_page", get_customer_history_page, customer_id,
+                           limit=chunk_size, ticket_fields=ticket_fields)
+
+    start = time.perf_counter()
+    try:
+        customer = await _execute("get_customer", get_customer, customer_id)
+        if customer is None:
+            missing = {"error": f"Customer {customer_id} not found."}
+            metrics.record("stream_customer_history", time.perf_counter() - start, missing)
+            return missing
+
+        def fetch_page(cursor: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+            page = get_customer_history_page(customer_id, limit=chunk_size, cursor=cursor,
+                                             fields=["id"], ticket_fields=ticket_fields)
+            return page["tickets"], page["next_cursor"]
+
+        streamed = await _stream_pages("stream_customer_history", ctx, fetch_page)
+    except Exception as e:
+        metrics.record("stream_customer_history", time.perf_counter() - start, error=type(e).__name__)
+        return _error(e)
+    metrics.record("stream_customer_history", time.perf_counter() - start, rows=streamed["rows"])
+    return {"customer": customer, "streamed": streamed}
+
+
+# ---------------------------------------------------------------------------
+# Tool: batch
+# ---------------------------------------------------------------------------
+# Data-layer functions reachable from tool_batch, keyed by their tool name
+# without the "tool_" prefix.
+BATCH_READ_TOOLS: Dict[str, Callable[..., Any]] = {
+    "get_customer": get_customer,
+    "list_customers": list_customers,
+    "list_customers_page": list_customers_page,
+    "get_customer_history": get_customer_history,
+    "get_customer_history_page": get_customer_history_page,
+    "get_customers_bulk": get_customers_bulk,
+    "get_customer_histories_bulk": get_customer_histories_bulk,
+    "get_ticket_stats": get_ticket_stats,
+    "list_tickets": list_tickets,
+    "search_tickets": search_tickets,
+}
+BATCH_WRITE_TOOLS: Dict[str, Callable[..., Any]] = {
+    "update_customer": update_customer,
+    "create_ticket": create_ticket,
+    "create_tickets_bulk": create_tickets_bulk,
+}
+MAX_BATCH_OPS = 50
+
+
+def _error_item(name: str, e: Exception) -> Dict[str, Any]:
+    return {"tool": name, **_error(e)}
+
+
+def _run_writes(ops: List[Any]) -> List[Dict[str, Any]]:
+    """
+    Run operations in request order in one transaction, one savepoint per
+    item. Reads among them see the writes before them.
+    """
+    results = []
+    with transaction():
+        for name, fn, args in ops:
+            try:
+                with savepoint():
+                    results.append({"tool": name, "result": fn(**args)})
+            except Exception as e:
+                results.append(_error_item(name, e))
+    return results
+
+
+@mcp.tool()
+async def tool_batch(operations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Run several tool calls in one request.
+    operations: [{"tool": "get_customer", "args": {"customer_id": 1}}, ...]
+    Tool names may omit the "tool_" prefix. Results reflect request order:
+    reads before the first write run concurrently first; everything from the
+    first to the last write (update_customer, create_ticket,
+    create_tickets_bulk) then runs in order in a single transaction, each
+    item rolled back individually on error; reads after the last write run
+    concurrently once it has committed. Returns one {"tool", "result"} or
+    {"tool", "error"} item per operation, in order.
+    """
+    if len(operations) > MAX_BATCH_OPS:
+        return [{"error": f"too many operations: {len(operations)} > {MAX_BATCH_OPS}"}]
+
+    start = time.perf_counter()
+    results: List[Optional[Dict[str, Any]]] = [None] * len(operations)
+    ops = []  # (index, name, fn, args, is_write) for valid operations
+
+    for i, op in enumerate(operations):
+        name = str(op.get("tool", "")) if isinstance(op, dict) else ""
+        name = name[len("tool_"):] if name.startswith("tool_") else name
+        args = op.get("args") or {} if isinstance(op, dict) else {}
+        if not isinstance(args, dict):
+            results[i] = {"tool": name, "error": "args must be an object"}
+        elif name in BATCH_WRITE_TOOLS:
+            ops.append((i, name, BATCH_WRITE_TOOLS[name], args, True))
+        elif name in BATCH_READ_TOOLS:
+            ops.append((i, name, BATCH_READ_TOOLS[name], args, False))
+        else:
+            results[i] = {"tool": name, "error": f"unknown tool: {name!r}"}
+
+    write_at = [k for k, op in enumerate(ops) if op[4]]
+    if write_at:
+        first, last = write_at[0], write_at[-1] + 1
+        leading, ordered, trailing = ops[:first], ops[first:last], ops[last:]
+    else:
+        leading, ordered, trailing = ops, [], []
+
+    async def read(name: str, fn: Callable[..., Any], args: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return {"tool": name, "result": await _execute(name, fn, **args)}
+        except Exception as e:
+            return _error_item(name, e)
+
+    async def read_all(segment: List[Any]) -> None:
+        items = await asyncio.gather(*(read(name, fn, args) for _, name, fn, args, _ in segment))
+        for (i, *_), item in zip(segment, items):
+            results[i] = item
+
+    await read_all(leading)
+    if ordered:
+        try:
+            ordered_results = await _execute(
+                "batch_writes", _run_writes, [(name, fn, args) for _, name, fn, args, _ in ordered]
+            )
+        except Exception as e:
+            ordered_results = [_error_item(name, e) for _, name, _, _, _ in ordered]
+        for (i, *_), item in zip(ordered, ordered_results):
+            results[i] = item
+    await read_all(trailing)
+
+    if metrics.enabled:
+        rows, payload = await asyncio.get_running_loop().run_in_executor(None, measure, results)
+        metrics.record("batch", time.perf_counter() - start, results, rows=rows, payload=payload)
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Tool: pool_stats
+# ---------------------------------------------------------------------------
+@mcp.tool()
+def tool_pool_stats() -> Dict[str, Any]:
+    """
+    Return database connection pool counters (size, idle, waits, timeouts...).
+    """
+    return _record_sync("pool_stats", pool_stats)
+
+
+# ---------------------------------------------------------------------------
+# Tool: cache_stats
+# ---------------------------------------------------------------------------
+@mcp.tool()
+def tool_cache_stats() -> Dict[str, Any]:
+    """
+    Return read-cache counters (hits, misses, evictions, invalidations...).
+    """
+    return _record_sync("cache_stats", cache_stats)
+
+
+# ---------------------------------------------------------------------------
+# Tool: executor_stats
+# ---------------------------------------------------------------------------
+@mcp.tool()
+def tool_executor_stats() -> Dict[str, Any]:
+    """
+    Return tool executor queue depths (waiting / queued / running) per tool.
+    """
+    return _record_sync("executor_stats", executor.stats)
+
+
+# ---------------------------------------------------------------------------
+# Tool: server_stats
+# ---------------------------------------------------------------------------
+def _gauges() -> Dict[str, float]:
+    """Point-in-time gauges appended to the Prometheus dump."""
+    exec_stats = executor.stats()
+    pools = pool_stats()
+    cache = cache_stats()
+    admission_stats = admission.stats()
+    return {
+        "mcp_executor_queued": exec_stats["queued"],
+        "mcp_executor_running": exec_stats["running"],
+        "mcp_executor_waiting": exec_stats["waiting"],
+        "mcp_db_pool_in_use": pools["write"]["in_use"] + pools["read"]["in_use"],
+        "mcp_cache_hit_rate": cache["hit_rate"],
+        "mcp_single_flight_coalesced": flight.stats()["coalesced"],
+        "mcp_admission_inflight": admission_stats["inflight"],
+        "mcp_admission_queued": admission_stats["queued"],
+        "mcp_admission_shed": sum(
+            c["rejected"] + c["displaced"] + c["expired"]
+            for c in admission_stats["classes"].values()
+        ),
+    }
+
+
+@mcp.tool()
+def tool_server_stats() -> Dict[str, Any]:
+    """
+    Per-tool call counts, errors by type, latency percentiles (p50/p95/p99),
+    rows and payload bytes, coalesced read counts, admission (admitted /
+    queued / shed per priority class), plus executor, pool and cache stats.
+    """
+    return _record_sync("server_stats", lambda: {
+        "tools": metrics.snapshot(),
+        "single_flight": flight.stats(),
+        "admission": admission.stats(),
+        "executor": executor.stats(),
+        "pool": pool_stats(),
+        "cache": cache_stats(),
+    })
 
 
 # ---------------------------------------------------------------------------
 # Start server (when executed directly)
 # ---------------------------------------------------------------------------
 if __name__ == "__main__":
-    print("Starting MCP server: customer-support-mcp")
-    mcp.run(
-)
+    # stdout carries the stdio transport, so diagnostics go to stderr
+    print("Starting MCP server: customer-support-mcp", file=sys.stderr)
+    # Fail fast if the database is missing instead of on the first tool call
+    print("Database:", get_pool().path, file=sys.stderr)
+
+    # Optional Prometheus textfile export
+    metrics_file = os.environ.get(METRICS_FILE_ENV)
+    exporter = None
+    if metrics_file and metrics.enabled:
+        interval = float(os.environ.get(METRICS_INTERVAL_ENV, "15"))
+        exporter = start_file_exporter(metrics, metrics_file, interval, _gauges)
+
+    try:
+        mcp.run()
+    finally:
+        if exporter is not None:
+            exporter.set()
+            metrics.dump_prometheus(metrics_file, _gauges())
+        executor.shutdown()
@@ -1,8 +1,61 @@
+import atexit
+import base64
+import binascii
+import copy
+import json
+import os
+import queue
+import re
 import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple, Union
 
 DB_FILENAME = "../support.db"
+DB_PATH_ENV = "SUPPORT_DB_PATH"  # overrides DB_FILENAME (e.g. for server workers)
+
+POOL_MAX_SIZE = 8
+POOL_TIMEOUT = 5.0  # seconds to wait for a free connection
+POOL_HEALTH_CHECK_INTERVAL = 30.0  # idle seconds before a connection is re-checked
+
+# Per-deployment SQLite tuning. "default" keeps SQLite's own settings
+# (rollback journal); "wal" lets readers run alongside a writer.
+DB_PROFILE_ENV = "SUPPORT_DB_PROFILE"
+PRAGMA_PROFILES: Dict[str, Dict[str, Any]] = {
+    "default": {},
+    "wal": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -16000,  # KiB (negative) -> ~16 MB page cache
+        "mmap_size": 134217728,  # 128 MB
+        "busy_timeout": 5000,  # ms
+        "temp_store": "MEMORY",
+    },
+    "wal-durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -16000,
+        "busy_timeout": 5000,
+    },
+}
+
+CACHE_MAX_SIZE = 1024
+CACHE_TTL = 30.0  # seconds a cached read stays valid
+
+CUSTOMER_FIELDS = ("id", "name", "email", "phone", "status", "created_at", "updated_at")
+TICKET_FIELDS = ("id", "customer_id", "issue", "status", "priority", "created_at")
+RESULT_FORMATS = ("rows", "compact")
+
+TICKET_STATUSES = ("open", "in_progress", "resolved")
+TICKET_PRIORITIES = ("low", "medium", "high")
+CUSTOMER_STATUSES = ("active", "disabled")
+
+MAX_PAGE_SIZE = 500
+ITER_BATCH_SIZE = 500
 
 
 class ToolError(Exception):
@@ -11,28 +64,493 @@ class ToolError(Exception):
 
 
 def _db_path() -> Path:
+    if os.environ.get(DB_PATH_ENV):
+        return Path(os.environ[DB_PATH_ENV]).resolve()
     base = Path(__file__).resolve().parent
     return base / DB_FILENAME
 
 
+def _profile_pragmas(profile: str) -> Dict[str, Any]:
+    try:
+        return PRAGMA_PROFILES[profile]
+    except KeyError:
+        raise ToolError(f"Unknown database profile: {profile!r} (expected one of {sorted(PRAGMA_PROFILES)})")
+
+
+def apply_pragmas(conn: sqlite3.Connection, pragmas: Dict[str, Any], readonly: bool = False) -> None:
+    """
+    Apply a PRAGMA profile to a connection. journal_mode is a database-level
+    setting that read-only connections cannot change, so it is skipped there.
+    """
+    for name, value in pragmas.items():
+        if readonly and name == "journal_mode":
+            continue
+        conn.execute(f"PRAGMA {name} = {value}")
+
+
+class ConnectionPool:
+    """
+    Bounded pool of SQLite connections shared by all tool functions.
+
+    Connections are opened lazily up to ``max_size`` and handed out LIFO so a
+    mostly idle server keeps reusing the same warm connection. Connections that
+    sat idle longer than ``health_check_interval`` are probed before reuse.
+    A ``readonly`` pool opens ``mode=ro`` URIs, so its readers can never take
+    a write lock.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_size: int = POOL_MAX_SIZE,
+        timeout: float = POOL_TIMEOUT,
+        health_check_interval: float = POOL_HEALTH_CHECK_INTERVAL,
+        readonly: bool = False,
+        pragmas: Optional[Dict[str, Any]] = None,
+    ):
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+        if not path.exists():
+            raise ToolError(f"Database file not found: {path}")
+
+        self.path = path
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.readonly = readonly
+        self.pragmas = pragmas or {}
+
+        self._idle: "queue.LifoQueue[Tuple[sqlite3.Connection, float]]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._size = 0
+        self._closed = False
+        self._counters = {
+            "created": 0,
+            "acquired": 0,
+            "released": 0,
+            "discarded": 0,
+            "waits": 0,
+            "timeouts": 0,
+        }
+
+    def _bump(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def _open(self) -> sqlite3.Connection:
+        if self.readonly:
+            conn = sqlite3.connect(f"{self.path.as_uri()}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        apply_pragmas(conn, self.pragmas, readonly=self.readonly)
+        self._bump("created")
+        return conn
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            self._size -= 1
+            self._counters["discarded"] += 1
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    @staticmethod
+    def _healthy(conn: sqlite3.Connection) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _grow(self) -> Optional[sqlite3.Connection]:
+        """Open a new connection if the pool is below max_size."""
+        with self._lock:
+            if self._size >= self.max_size:
+                return None
+            self._size += 1
+        try:
+            return self._open()
+        except sqlite3.Error as e:
+            with self._lock:
+                self._size -= 1
+            raise ToolError(f"Could not open database connection: {e}")
+
+    def acquire(self) -> sqlite3.Connection:
+        """Check a connection out of the pool, waiting up to ``timeout``."""
+        while True:
+            if self._closed:
+                raise ToolError("Connection pool is closed.")
+
+            try:
+                conn, idle_since = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._grow()
+                if conn is not None:
+                    break
+                self._bump("waits")
+                try:
+                    conn, idle_since = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    self._bump("timeouts")
+                    raise ToolError("Timed out waiting for a database connection.")
+
+            if time.monotonic() - idle_since < self.health_check_interval or self._healthy(conn):
+                break
+            self._discard(conn)
+
+        self._bump("acquired")
+        return conn
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """Return a connection to the pool, rolling back any open transaction."""
+        self._bump("released")
+        if self._closed:
+            self._discard(conn)
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        self._idle.put((conn, time.monotonic()))
+
+    def close(self) -> None:
+        """Close every idle connection; in-use ones are closed on release."""
+        self._closed = True
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            idle = self._idle.qsize()
+            return {
+                "path": str(self.path),
+                "readonly": self.readonly,
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": idle,
+                "in_use": self._size - idle,
+                "closed": self._closed,
+                **self._counters,
+            }
+
+
+_pool: Optional[ConnectionPool] = None
+_read_pool: Optional[ConnectionPool] = None
+_profile = os.environ.get(DB_PROFILE_ENV, "default")
+_pool_lock = threading.Lock()
+
+
+def _build_pools(
+    path: Path,
+    max_size: int,
+    timeout: float,
+    profile: str,
+) -> Tuple[ConnectionPool, ConnectionPool]:
+    """Create the (write, read-only) pool pair for one database and profile."""
+    pragmas = _profile_pragmas(profile)
+    writer = ConnectionPool(path, max_size, timeout, pragmas=pragmas)
+    # Open one writer connection first so database-level settings such as
+    # journal_mode=WAL are in place before any read-only connection exists.
+    writer.release(writer.acquire())
+    reader = ConnectionPool(path, max_size, timeout, readonly=True, pragmas=pragmas)
+    return writer, reader
+
+
+def get_pool(readonly: bool = False) -> ConnectionPool:
+    """
+    Return the shared write pool (or the read-only pool), creating both on
+    first use with the profile named by $SUPPORT_DB_PROFILE.
+    """
+    global _pool, _read_pool
+    if _pool is None or _read_pool is None:
+        with _pool_lock:
+            if _pool is None or _read_pool is None:
+                _pool, _read_pool = _build_pools(_db_path(), POOL_MAX_SIZE, POOL_TIMEOUT, _profile)
+    return _read_pool if readonly else _pool
+
+
+def configure_pool(
+    db_path: Optional[Path] = None,
+    max_size: int = POOL_MAX_SIZE,
+    timeout: float = POOL_TIMEOUT,
+    profile: Optional[str] = None,
+) -> ConnectionPool:
+    """
+    Replace the shared pools (e.g. different database, size or PRAGMA
+    profile). The previous pools are closed. Returns the write pool.
+    """
+    global _pool, _read_pool, _profile
+    profile = profile or _profile
+    writer, reader = _build_pools(Path(db_path) if db_path else _db_path(), max_size, timeout, profile)
+    with _pool_lock:
+        old = (_pool, _read_pool)
+        _pool, _read_pool, _profile = writer, reader, profile
+    for p in old:
+        if p is not None:
+            p.close()
+    return writer
+
+
+def close_pool() -> None:
+    """Close the shared pools (called automatically at interpreter exit)."""
+    global _pool, _read_pool
+    with _pool_lock:
+        old = (_pool, _read_pool)
+        _pool = _read_pool = None
+    for p in old:
+        if p is not None:
+            p.close()
+
+
+def pool_stats() -> Dict[str, Any]:
+    """
+    Return counters for the shared write and read-only pools, for monitoring.
+    """
+    return {
+        "profile": _profile,
+        "write": get_pool().stats(),
+        "read": get_pool(readonly=True).stats(),
+    }
+
+
+atexit.register(close_pool)
+
+# Per-thread state of an open transaction(): the pinned connection and the
+# cache keys to invalidate once it commits.
+_local = threading.local()
+
+
+@contextmanager
+def _connection(readonly: bool = False) -> Iterator[sqlite3.Connection]:
+    """
+    Borrow a pooled connection for the duration of a block. The block runs in
+    a transaction that is committed on success and rolled back on error.
+    Pass readonly=True for pure reads to use the ``mode=ro`` pool.
+
+    Inside transaction() every call on that thread joins the open transaction
+    instead, which is committed when transaction() exits.
+    """
+    joined = getattr(_local, "conn", None)
+    if joined is not None:
+        yield joined
+        return
+
+    pool = get_pool(readonly)
+    conn = pool.acquire()
+    try:
+        with conn:
+            yield conn
+    finally:
+        pool.release(conn)
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire after ``ttl`` seconds.
+
+    ``generation()`` / ``set(..., generation)`` guard against a reader that
+    started before a write storing the pre-write value after the write's
+    invalidation: such a ``set`` is silently dropped.
+    """
+
+    def __init__(self, max_size: int = CACHE_MAX_SIZE, ttl: float = CACHE_TTL, enabled: bool = True):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.enabled = enabled
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+        }
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Return (hit, value)."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return False, None
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._data[key]
+                self._counters["expirations"] += 1
+                self._counters["misses"] += 1
+                return False, None
+            self._data.move_to_end(key)
+            self._counters["hits"] += 1
+            return True, value
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def invalidate(self, *keys: Hashable) -> None:
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                if self._data.pop(key, None) is not None:
+                    self._counters["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                "enabled": self.enabled,
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hit_rate": self._counters["hits"] / lookups if lookups else 0.0,
+                **self._counters,
+            }
+
+
+_cache = TTLCache()
 
-def _connect() -> sqlite3.Connection:
+
+def configure_cache(
+    max_size: Optional[int] = None,
+    ttl: Optional[float] = None,
+    enabled: Optional[bool] = None,
+) -> None:
+    """
+    Adjust the read cache used by get_customer / get_customer_history.
+    Any change clears the cache; pass enabled=False to bypass it (tests).
+    """
+    if max_size is not None:
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+        _cache.max_size = max_size
+    if ttl is not None:
+        _cache.ttl = ttl
+    if enabled is not None:
+        _cache.enabled = enabled
+    _cache.clear()
+
+
+def clear_cache() -> None:
+    """Drop every cached read."""
+    _cache.clear()
+
+
+def cache_stats() -> Dict[str, Any]:
+    """
+    Return hit/miss/eviction counters for the read cache.
+    """
+    return _cache.stats()
+
+
+def _invalidate(*keys: Hashable) -> None:
+    """Invalidate cache keys after a write (deferred to commit inside transaction())."""
+    pending = getattr(_local, "pending_invalidations", None)
+    if pending is not None:
+        pending.extend(keys)
+    else:
+        _cache.invalidate(*keys)
+
+
+@contextmanager
+def transaction() -> Iterator[sqlite3.Connection]:
+    """
+    Run several tool calls on this thread as one write transaction.
+
+    Tool functions called inside the block share a single pooled connection
+    and nothing is committed until the block exits; an exception rolls
+    everything back. Combine with savepoint() to undo individual steps.
+    """
+    if getattr(_local, "conn", None) is not None:
+        raise ToolError("transaction() cannot be nested.")
+
+    pool = get_pool()
+    conn = pool.acquire()
+    _local.conn = conn
+    _local.pending_invalidations = []
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        _cache.invalidate(*_local.pending_invalidations)
+    finally:
+        _local.conn = None
+        _local.pending_invalidations = None
+        pool.release(conn)
+
+
+@contextmanager
+def savepoint(name: str = "tool_step") -> Iterator[None]:
+    """
+    Inside transaction(): if the block raises, undo only its changes (the
+    exception still propagates) and keep the outer transaction open.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        raise ToolError("savepoint() requires an open transaction().")
+
+    conn.execute(f"SAVEPOINT {name}")
+    try:
+        yield
+    except BaseException:
+        conn.execute(f"ROLLBACK TO {name}")
+        conn.execute(f"RELEASE {name}")
+        raise
+    conn.execute(f"RELEASE {name}")
+
+
+def _cached(key: Hashable, loader: Callable[[], Any]) -> Any:
     """
-    Open a new database connection.
+    Read-through helper: serve ``key`` from the cache or call ``loader``.
+    Inside transaction() the cache is bypassed both ways: reads must see the
+    transaction's own writes, and uncommitted rows must not be cached.
     """
-    path = _db_path()
-    if not path.exists():
-        raise ToolError(f"Database file not found: {path}")
+    if not _cache.enabled or getattr(_local, "conn", None) is not None:
+        return loader()
+
+    hit, value = _cache.get(key)
+    if hit:
+        return copy.deepcopy(value)
 
-    conn = sqlite3.connect(path)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON")
-    return conn
+    generation = _cache.generation()
+    value = loader()
+    if value is not None:
+        _cache.set(key, copy.deepcopy(value), generation)
+    return value
 
 
 def _fetch_one(query: str, params: Tuple[Any, ...]) -> Optional[Dict[str, Any]]:
     """Internal helper to run a SELECT that returns a single row."""
-    with _connect() as conn:
+    with _connection(readonly=True) as conn:
         cur = conn.cursor()
         cur.execute(query, params)
         row = cur.fetchone()
@@ -43,39 +561,146 @@ def _fetch_one(query: str, params: Tuple[Any, ...]) -> Optional[Dict[str, Any]]:
 
 def _fetch_all(query: str, params: Tuple[Any, ...]) -> List[Dict[str, Any]]:
     """Internal helper to run a SELECT that returns multiple rows."""
-    with _connect() as conn:
+    with _connection(readonly=True) as conn:
         cur = conn.cursor()
         cur.execute(query, params)
         rows = cur.fetchall()
         return [dict(r) for r in rows]
 
 
+def _normalize_ids(ids: List[Any]) -> List[int]:
+    """Coerce a list of IDs to ints, dropping duplicates but keeping order."""
+    seen: Dict[int, None] = {}
+    for raw in ids:
+        try:
+            seen.setdefault(int(raw), None)
+        except (TypeError, ValueError):
+            raise ToolError(f"Invalid customer id: {raw!r}")
+    return list(seen)
 
 
-def get_customer(customer_id: int) -> Optional[Dict[str, Any]]:
+def _encode_cursor(state: Dict[str, Any]) -> str:
+    """Pack pagination state into an opaque, URL-safe token."""
+    raw = json.dumps(state, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, ints: Tuple[str, ...] = ()) -> Dict[str, Any]:
+    """
+    Inverse of _encode_cursor; raises ToolError on a malformed token,
+    including one whose ``ints`` keys are missing or not integers.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise ToolError("Invalid pagination cursor.")
+    if not isinstance(state, dict):
+        raise ToolError("Invalid pagination cursor.")
+    for key in ints:
+        value = state.get(key)
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise ToolError("Invalid pagination cursor.")
+    return state
+
+
+def _project(
+    fields: Optional[List[str]],
+    allowed: Tuple[str, ...],
+    label: str = "field",
+    allow_empty: bool = False,
+) -> List[str]:
+    """
+    Validate a ``fields`` projection; None means every allowed field. An
+    empty list is rejected unless ``allow_empty`` (history ticket counts).
+    """
+    if fields is None:
+        return list(allowed)
+    if isinstance(fields, str):
+        fields = [fields]
+    if not fields and not allow_empty:
+        raise ToolError(f"fields must name at least one {label}")
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        raise ToolError(f"Unknown {label}(s) {unknown}; expected any of {list(allowed)}")
+    return list(dict.fromkeys(fields))
+
+
+def _select(
+    columns: List[str],
+    required: Tuple[str, ...] = (),
+    expressions: Optional[Dict[str, str]] = None,
+) -> str:
+    """
+    Build a SELECT list for the projected columns, plus ``required`` ones the
+    query needs internally (ordering, cursors, grouping). ``expressions``
+    maps output names to SQL when they differ (e.g. joined columns).
+    """
+    expressions = expressions or {}
+    names = columns + [c for c in required if c not in columns]
+    return ", ".join(
+        f"{expressions[n]} AS {n}" if n in expressions else n for n in names
+    )
+
+
+def _check_format(format: str) -> None:
+    if format not in RESULT_FORMATS:
+        raise ToolError(f"Invalid format: {format!r} (expected one of {list(RESULT_FORMATS)})")
+
+
+def _shape(rows: List[Dict[str, Any]], columns: List[str], format: str) -> Any:
+    """
+    Render rows as a list of dicts ("rows") or, for "compact", as
+    {"columns": [...], "rows": [[...], ...]} so keys are sent only once.
+    Columns that were only selected for internal use are dropped.
+    """
+    if format == "compact":
+        return {"columns": columns, "rows": [[r[c] for c in columns] for r in rows]}
+    if rows and len(rows[0]) != len(columns):
+        return [{c: r[c] for c in columns} for r in rows]
+    return rows
+
+
+
+
+def get_customer(customer_id: int, fields: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
     """
     Return a single customer record by ID.
+    ``fields`` limits the returned keys (see CUSTOMER_FIELDS).
     """
+    columns = _project(fields, CUSTOMER_FIELDS)
     sql = """
         SELECT id, name, email, phone, status,
                created_at, updated_at
         FROM customers
         WHERE id = ?
     """
-    return _fetch_one(sql, (customer_id,))
+    customer = _cached(("customer", customer_id), lambda: _fetch_one(sql, (customer_id,)))
+    # Single rows come from the cache, so project them here rather than in SQL
+    if customer is None or fields is None:
+        return customer
+    return {c: customer[c] for c in columns}
 
 
-def list_customers(status: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+def list_customers(
+    status: Optional[str] = None,
+    limit: int = 20,
+    fields: Optional[List[str]] = None,
+    format: str = "rows",
+) -> Any:
     """
     List customers, optionally filtered by status ("active" / "disabled").
+    ``fields`` projects columns in the SELECT; format="compact" returns
+    {"columns": [...], "rows": [[...]]} instead of a list of dicts.
     """
     if limit <= 0:
         limit = 20  # sane default
+    columns = _project(fields, CUSTOMER_FIELDS)
+    _check_format(format)
 
     if status:
-        sql = """
-            SELECT id, name, email, phone, status,
-                   created_at, updated_at
+        sql = f"""
+            SELECT {_select(columns)}
             FROM customers
             WHERE status = ?
             ORDER BY id
@@ -83,16 +708,108 @@ def list_customers(status: Optional[str] = None, limit: int = 20) -> List[Dict[s
         """
         params: Tuple[Any, ...] = (status, limit)
     else:
-        sql = """
-            SELECT id, name, email, phone, status,
-                   created_at, updated_at
+        sql = f"""
+            SELECT {_select(columns)}
             FROM customers
             ORDER BY id
             LIMIT ?
         """
         params = (limit,)
 
-    return _fetch_all(sql, params)
+    return _shape(_fetch_all(sql, params), columns, format)
+
+
+def list_customers_page(
+    status: Optional[str] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    format: str = "rows",
+) -> Dict[str, Any]:
+    """
+    Keyset-paginated customer listing ordered by id.
+
+    Returns {"customers": [...], "next_cursor": str | None}. Pass
+    ``next_cursor`` back (with the same status filter) to get the next page.
+    ``fields`` / ``format`` work as in list_customers.
+    """
+    if limit <= 0:
+        limit = 20
+    limit = min(limit, MAX_PAGE_SIZE)
+    columns = _project(fields, CUSTOMER_FIELDS)
+    _check_format(format)
+
+    after_id = 0
+    if cursor:
+        state = _decode_cursor(cursor, ints=("after",))
+        if state.get("status") != status:
+            raise ToolError("Cursor does not match the requested status filter.")
+        after_id = state["after"]
+
+    # Fetch one extra row to know whether another page exists
+    if status:
+        sql = f"""
+            SELECT {_select(columns, required=("id",))}
+            FROM customers
+            WHERE status = ? AND id > ?
+            ORDER BY id
+            LIMIT ?
+        """
+        params: Tuple[Any, ...] = (status, after_id, limit + 1)
+    else:
+        sql = f"""
+            SELECT {_select(columns, required=("id",))}
+            FROM customers
+            WHERE id > ?
+            ORDER BY id
+            LIMIT ?
+        """
+        params = (after_id, limit + 1)
+
+    rows = _fetch_all(sql, params)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor({"after": rows[-1]["id"], "status": status})
+
+    return {"customers": _shape(rows, columns, format), "next_cursor": next_cursor}
+
+
+def iter_customers(
+    status: Optional[str] = None,
+    batch_size: int = ITER_BATCH_SIZE,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream every customer (optionally filtered by status) ordered by id.
+
+    Rows are pulled from one cursor with fetchmany(batch_size), so memory use
+    stays flat regardless of table size. The pooled connection is held until
+    the generator is exhausted or closed.
+    """
+    if batch_size <= 0:
+        batch_size = ITER_BATCH_SIZE
+
+    sql = """
+        SELECT id, name, email, phone, status,
+               created_at, updated_at
+        FROM customers
+    """
+    params: Tuple[Any, ...] = ()
+    if status:
+        sql += " WHERE status = ?"
+        params = (status,)
+    sql += " ORDER BY id"
+
+    with _connection(readonly=True) as conn:
+        cur = conn.cursor()
+        cur.arraysize = batch_size
+        cur.execute(sql, params)
+        while True:
+            batch = cur.fetchmany()
+            if not batch:
+                break
+            for row in batch:
+                yield dict(row)
 
 
 def update_customer(customer_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
@@ -112,30 +829,27 @@ def update_customer(customer_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
     values = [data[f] for f in fields]
     values.append(customer_id)
 
-    with _connect() as conn:
+    # RETURNING hands back the updated row from the write itself. Triggers'
+    # changes are not visible to RETURNING, so updated_at is set here too.
+    with _connection() as conn:
         cur = conn.cursor()
-        cur.execute(f"UPDATE customers SET {set_clause} WHERE id = ?", values)
-        conn.commit()
-
-        if cur.rowcount == 0:
-            raise ToolError(f"Customer {customer_id} not found or not modified.")
-
-        # Return the fresh version from the DB
         cur.execute(
-            """
-            SELECT id, name, email, phone, status,
-                   created_at, updated_at
-            FROM customers
+            f"""
+            UPDATE customers
+            SET {set_clause}, updated_at = CURRENT_TIMESTAMP
             WHERE id = ?
+            RETURNING id, name, email, phone, status,
+                      created_at, updated_at
             """,
-            (customer_id,),
+            values,
         )
-        row = cur.fetchone()
-        if row is None:
-            # This really shouldn't happen if rowcount > 0, but be defensive.
-            raise ToolError(f"Customer {customer_id} disappeared after update.")
+        rows = cur.fetchall()
 
-        return dict(row)
+    if not rows:
+        raise ToolError(f"Customer {customer_id} not found or not modified.")
+
+    _invalidate(("customer", customer_id), ("history", customer_id))
+    return dict(rows[0])
 
 
 def create_ticket(customer_id: int, issue: str, priority: str = "medium") -> Dict[str, Any]:
@@ -145,56 +859,147 @@ def create_ticket(customer_id: int, issue: str, priority: str = "medium") -> Dic
     if not issue.strip():
         raise ToolError("Ticket issue cannot be empty.")
 
-    if priority not in ("low", "medium", "high"):
+    if priority not in TICKET_PRIORITIES:
         raise ToolError(f"Invalid priority: {priority}")
 
-    with _connect() as conn:
+    # The INSERT ... SELECT only produces a row when the customer exists,
+    # so the existence check, insert and read-back are one statement.
+    with _connection() as conn:
         cur = conn.cursor()
-
-        # Make sure the customer exists first
-        cur.execute("SELECT id FROM customers WHERE id = ?", (customer_id,))
-        if cur.fetchone() is None:
-            raise ToolError(f"Customer {customer_id} does not exist.")
-
         cur.execute(
             """
             INSERT INTO tickets (customer_id, issue, status, priority)
-            VALUES (?, ?, 'open', ?)
+            SELECT id, ?, 'open', ? FROM customers WHERE id = ?
+            RETURNING id, customer_id, issue, status, priority, created_at
             """,
-            (customer_id, issue, priority),
+            (issue, priority, customer_id),
         )
-        ticket_id = cur.lastrowid
-        conn.commit()
+        rows = cur.fetchall()
 
-        # Return the inserted row
-        cur.execute(
-            """
-            SELECT id, customer_id, issue, status, priority, created_at
-            FROM tickets
-            WHERE id = ?
-            """,
-            (ticket_id,),
-        )
-        row = cur.fetchone()
+    if not rows:
+        raise ToolError(f"Customer {customer_id} does not exist.")
 
-        if row is None:
-            raise ToolError("Failed to fetch ticket after insertion.")
+    _invalidate(("history", customer_id))
+    return dict(rows[0])
 
-        return dict(row)
 
+def create_tickets_bulk(tickets: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Create many tickets in one transaction.
 
-def get_customer_history(customer_id: int) -> Dict[str, Any]:
+    Each item needs ``customer_id`` and ``issue`` and may set ``priority``.
+    Invalid items (bad fields, unknown customer) are reported in ``errors``
+    with their index and skipped; the rest are inserted with executemany.
+    Returns {"created": [ticket, ...], "errors": [{"index", "error"}, ...]}.
+    """
+    errors: List[Dict[str, Any]] = []
+    valid: List[Tuple[int, int, str, str]] = []  # (index, customer_id, issue, priority)
+
+    for i, item in enumerate(tickets):
+        if not isinstance(item, dict):
+            errors.append({"index": i, "error": "Ticket must be an object."})
+            continue
+        try:
+            customer_id = int(item.get("customer_id"))
+        except (TypeError, ValueError):
+            errors.append({"index": i, "error": f"Invalid customer id: {item.get('customer_id')!r}"})
+            continue
+        issue = item.get("issue")
+        if not isinstance(issue, str) or not issue.strip():
+            errors.append({"index": i, "error": "Ticket issue cannot be empty."})
+            continue
+        priority = item.get("priority", "medium")
+        if priority not in TICKET_PRIORITIES:
+            errors.append({"index": i, "error": f"Invalid priority: {priority}"})
+            continue
+        valid.append((i, customer_id, issue, priority))
+
+    created: List[Dict[str, Any]] = []
+    if valid:
+        with _connection() as conn:
+            cur = conn.cursor()
+            # Take the write lock up front so the id range read below is ours
+            # (inside transaction() it is already held)
+            if not conn.in_transaction:
+                cur.execute("BEGIN IMMEDIATE")
+
+            cur.execute(
+                "SELECT id FROM customers WHERE id IN (SELECT value FROM json_each(?))",
+                (json.dumps(sorted({v[1] for v in valid})),),
+            )
+            existing = {r["id"] for r in cur.fetchall()}
+
+            rows_to_insert = []
+            for i, customer_id, issue, priority in valid:
+                if customer_id in existing:
+                    rows_to_insert.append((customer_id, issue, priority))
+                else:
+                    errors.append({"index": i, "error": f"Customer {customer_id} does not exist."})
+
+            if rows_to_insert:
+                cur.execute("SELECT COALESCE(MAX(id), 0) FROM tickets")
+                last_id = cur.fetchone()[0]
+                cur.executemany(
+                    """
+                    INSERT INTO tickets (customer_id, issue, status, priority)
+                    VALUES (?, ?, 'open', ?)
+                    """,
+                    rows_to_insert,
+                )
+                cur.execute(
+                    """
+                    SELECT id, customer_id, issue, status, priority, created_at
+                    FROM tickets
+                    WHERE id > ?
+                    ORDER BY id
+                    """,
+                    (last_id,),
+                )
+                created = [dict(r) for r in cur.fetchall()]
+
+        _invalidate(*(("history", t["customer_id"]) for t in created))
+
+    errors.sort(key=lambda e: e["index"])
+    return {"created": created, "errors": errors}
+
+
+def get_customer_history(
+    customer_id: int,
+    fields: Optional[List[str]] = None,
+    ticket_fields: Optional[List[str]] = None,
+    format: str = "rows",
+) -> Dict[str, Any]:
     """
     Return a small "view" of a customer's history:
+    {"customer": {...}, "tickets": [...]} with tickets newest first.
+
+    ``fields`` / ``ticket_fields`` project the customer and ticket columns;
+    ticket_fields=[] skips the tickets and returns "ticket_count" instead.
+    format="compact" returns the tickets as {"columns", "rows"}.
     """
-    with _connect() as conn:
+    if fields is None and ticket_fields is None and format == "rows":
+        return _cached(("history", customer_id), lambda: _load_customer_history(customer_id))
+    return _load_customer_history(customer_id, fields, ticket_fields, format)
+
+
+def _load_customer_history(
+    customer_id: int,
+    fields: Optional[List[str]] = None,
+    ticket_fields: Optional[List[str]] = None,
+    format: str = "rows",
+) -> Dict[str, Any]:
+    """Uncached body of get_customer_history."""
+    columns = _project(fields, CUSTOMER_FIELDS)
+    ticket_columns = _project(ticket_fields, TICKET_FIELDS, "ticket field", allow_empty=True)
+    _check_format(format)
+
+    with _connection(readonly=True) as conn:
         cur = conn.cursor()
 
         # Customer record
         cur.execute(
-            """
-            SELECT id, name, email, phone, status,
-                   created_at, updated_at
+            f"""
+            SELECT {_select(columns)}
             FROM customers
             WHERE id = ?
             """,
@@ -204,10 +1009,14 @@ def get_customer_history(customer_id: int) -> Dict[str, Any]:
         if customer_row is None:
             raise ToolError(f"Customer {customer_id} not found.")
 
+        if not ticket_columns:
+            cur.execute("SELECT COUNT(*) FROM tickets WHERE customer_id = ?", (customer_id,))
+            return {"customer": dict(customer_row), "ticket_count": cur.fetchone()[0]}
+
         # All tickets for this customer, newest first
         cur.execute(
-            """
-            SELECT id, customer_id, issue, status, priority, created_at
+            f"""
+            SELECT {_select(ticket_columns)}
             FROM tickets
             WHERE customer_id = ?
             ORDER BY created_at DESC, id DESC
@@ -218,11 +1027,418 @@ def get_customer_history(customer_id: int) -> Dict[str, Any]:
 
         return {
             "customer": dict(customer_row),
-            "tickets": tickets,
+            "tickets": _shape(tickets, ticket_columns, format),
         }
 
 
 
+def get_customer_history_page(
+    customer_id: int,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    ticket_fields: Optional[List[str]] = None,
+    format: str = "rows",
+) -> Dict[str, Any]:
+    """
+    Keyset-paginated customer history, newest tickets first.
+
+    Returns {"customer": {...}, "tickets": [...], "next_cursor": str | None}.
+    Pass ``next_cursor`` back with the same customer_id for the next page.
+    """
+    if limit <= 0:
+        limit = 100
+    limit = min(limit, MAX_PAGE_SIZE)
+    columns = _project(fields, CUSTOMER_FIELDS)
+    ticket_columns = _project(ticket_fields, TICKET_FIELDS, "ticket field")
+    _check_format(format)
+
+    before: Optional[List[Any]] = None
+    if cursor:
+        state = _decode_cursor(cursor)
+        if state.get("customer_id") != customer_id:
+            raise ToolError("Cursor does not match the requested customer.")
+        before = state.get("before")
+        if not isinstance(before, list) or len(before) != 2:
+            raise ToolError("Invalid pagination cursor.")
+
+    with _connection(readonly=True) as conn:
+        cur = conn.cursor()
+        cur.execute(
+            f"SELECT {_select(columns)} FROM customers WHERE id = ?",
+            (customer_id,),
+        )
+        customer_row = cur.fetchone()
+        if customer_row is None:
+            raise ToolError(f"Customer {customer_id} not found.")
+
+        sql = f"""
+            SELECT {_select(ticket_columns, required=("id", "created_at"))}
+            FROM tickets
+            WHERE customer_id = ?
+        """
+        params: Tuple[Any, ...] = (customer_id,)
+        if before is not None:
+            sql += " AND (created_at < ? OR (created_at = ? AND id < ?))"
+            params += (before[0], before[0], before[1])
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        cur.execute(sql, params + (limit + 1,))
+        rows = [dict(r) for r in cur.fetchall()]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = _encode_cursor(
+            {"customer_id": customer_id, "before": [last["created_at"], last["id"]]}
+        )
+
+    return {
+        "customer": dict(customer_row),
+        "tickets": _shape(rows, ticket_columns, format),
+        "next_cursor": next_cursor,
+    }
+
+
+def get_customers_bulk(
+    customer_ids: List[int],
+    fields: Optional[List[str]] = None,
+    format: str = "rows",
+) -> Any:
+    """
+    Return the customer records for many IDs with a single query.
+    Results follow the order of ``customer_ids``; unknown IDs are skipped.
+    ``fields`` / ``format`` work as in list_customers.
+    """
+    columns = _project(fields, CUSTOMER_FIELDS)
+    _check_format(format)
+    ids = _normalize_ids(customer_ids)
+    if not ids:
+        return _shape([], columns, format)
+
+    rows = _fetch_all(
+        f"""
+        SELECT {_select(columns, required=("id",))}
+        FROM customers
+        WHERE id IN (SELECT value FROM json_each(?))
+        """,
+        (json.dumps(ids),),
+    )
+    by_id = {r["id"]: r for r in rows}
+    return _shape([by_id[i] for i in ids if i in by_id], columns, format)
+
+
+def get_customer_histories_bulk(
+    customer_ids: List[int],
+    fields: Optional[List[str]] = None,
+    ticket_fields: Optional[List[str]] = None,
+    format: str = "rows",
+) -> List[Dict[str, Any]]:
+    """
+    Bulk version of get_customer_history: two queries regardless of how many
+    IDs are requested. Each item has the same shape as get_customer_history
+    (including the projection options); unknown IDs are skipped.
+    """
+    columns = _project(fields, CUSTOMER_FIELDS)
+    ticket_columns = _project(ticket_fields, TICKET_FIELDS, "ticket field", allow_empty=True)
+    _check_format(format)
+    ids = _normalize_ids(customer_ids)
+    if not ids:
+        return []
+
+    id_list = json.dumps(ids)
+    with _connection(readonly=True) as conn:
+        cur = conn.cursor()
+
+        cur.execute(
+            f"""
+            SELECT {_select(columns, required=("id",))}
+            FROM customers
+            WHERE id IN (SELECT value FROM json_each(?))
+            """,
+            (id_list,),
+        )
+        customers = {r["id"]: {c: r[c] for c in columns} for r in cur.fetchall()}
+
+        if not ticket_columns:
+            cur.execute(
+                """
+                SELECT customer_id, COUNT(*) AS n
+                FROM tickets
+                WHERE customer_id IN (SELECT value FROM json_each(?))
+                GROUP BY customer_id
+                """,
+                (id_list,),
+            )
+            counts = {r["customer_id"]: r["n"] for r in cur.fetchall()}
+            return [
+                {"customer": customers[i], "ticket_count": counts.get(i, 0)}
+                for i in ids if i in customers
+            ]
+
+        # Tickets for every customer at once, grouped in a single pass
+        cur.execute(
+            f"""
+            SELECT {_select(ticket_columns, required=("customer_id",))}
+            FROM tickets
+            WHERE customer_id IN (SELECT value FROM json_each(?))
+            ORDER BY customer_id, created_at DESC, id DESC
+            """,
+            (id_list,),
+        )
+        tickets: Dict[int, List[Dict[str, Any]]] = {i: [] for i in customers}
+        for r in cur.fetchall():
+            tickets[r["customer_id"]].append(dict(r))
+
+    return [
+        {"customer": customers[i], "tickets": _shape(tickets[i], ticket_columns, format)}
+        for i in ids if i in customers
+    ]
+
+
+
+def get_ticket_stats(customer_status: Optional[str] = None, format: str = "rows") -> Dict[str, Any]:
+    """
+    Per-customer ticket counts by status and priority, computed in SQL with a
+    single GROUP BY (only customers that have tickets are listed).
+
+    Returns {"customers": [...], "totals": {...}} where each customer row has
+    customer_id, name, customer_status, total, one count per ticket status
+    and priority, and high_unresolved (high priority, not resolved).
+    format="compact" returns the customer rows as {"columns", "rows"}.
+    """
+    if customer_status is not None and customer_status not in CUSTOMER_STATUSES:
+        raise ToolError(f"Invalid customer status: {customer_status}")
+    _check_format(format)
+
+    status_counts = ",\n".join(
+        f"COUNT(CASE WHEN t.status = '{v}' THEN 1 END) AS {v}" for v in TICKET_STATUSES
+    )
+    priority_counts = ",\n".join(
+        f"COUNT(CASE WHEN t.priority = '{v}' THEN 1 END) AS {v}" for v in TICKET_PRIORITIES
+    )
+    sql = f"""
+        SELECT c.id AS customer_id, c.name, c.status AS customer_status,
+               COUNT(*) AS total,
+               {status_counts},
+               {priority_counts},
+               COUNT(CASE WHEN t.priority = 'high' AND t.status != 'resolved' THEN 1 END)
+                   AS high_unresolved
+        FROM tickets t
+        JOIN customers c ON c.id = t.customer_id
+        {"WHERE c.status = ?" if customer_status else ""}
+        GROUP BY c.id
+        ORDER BY c.id
+    """
+    params: Tuple[Any, ...] = (customer_status,) if customer_status else ()
+    rows = _fetch_all(sql, params)
+
+    count_keys = ("total", *TICKET_STATUSES, *TICKET_PRIORITIES, "high_unresolved")
+    totals = {k: sum(r[k] for r in rows) for k in count_keys}
+    totals["customers"] = len(rows)
+    columns = ["customer_id", "name", "customer_status", *count_keys]
+    return {"customers": _shape(rows, columns, format), "totals": totals}
+
+
+
+# Output name -> SQL for list_tickets' tickets JOIN customers query
+_TICKET_LIST_COLUMNS = {
+    **{f: f"t.{f}" for f in TICKET_FIELDS},
+    "customer_name": "c.name",
+    "customer_email": "c.email",
+    "customer_status": "c.status",
+}
+TICKET_LIST_FIELDS = tuple(_TICKET_LIST_COLUMNS)
+
+
+def _as_choices(value: Union[str, List[str], None], allowed: Tuple[str, ...], label: str) -> List[str]:
+    """Normalise a single value or list filter and validate it."""
+    if value is None:
+        return []
+    values = [value] if isinstance(value, str) else list(value)
+    for v in values:
+        if v not in allowed:
+            raise ToolError(f"Invalid {label}: {v}")
+    return values
+
+
+def _as_timestamp(value: Optional[str], label: str) -> Optional[str]:
+    """
+    Validate an ISO date/datetime and format it like SQLite's CURRENT_TIMESTAMP
+    (UTC). Values with an offset are converted to UTC; naive ones are taken
+    as UTC already.
+    """
+    if value is None:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ToolError(f"Invalid {label} (expected ISO date/time): {value!r}")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc)
+    return parsed.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def list_tickets(
+    status: Union[str, List[str], None] = None,
+    priority: Union[str, List[str], None] = None,
+    customer_status: Optional[str] = None,
+    customer_id: Optional[int] = None,
+    created_after: Optional[str] = None,
+    created_before: Optional[str] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    format: str = "rows",
+) -> Dict[str, Any]:
+    """
+    List tickets, newest first, with every filter evaluated in SQL.
+
+    status / priority accept one value or a list. created_after (inclusive)
+    and created_before (exclusive) take ISO dates. Each ticket carries its
+    customer's name, email and status. Keyset-paginated like
+    list_customers_page: returns {"tickets": [...], "next_cursor": ...}.
+    ``fields`` (see TICKET_LIST_FIELDS) / ``format`` work as in list_customers.
+    """
+    statuses = _as_choices(status, TICKET_STATUSES, "status")
+    priorities = _as_choices(priority, TICKET_PRIORITIES, "priority")
+    if customer_status is not None and customer_status not in CUSTOMER_STATUSES:
+        raise ToolError(f"Invalid customer status: {customer_status}")
+    after = _as_timestamp(created_after, "created_after")
+    before = _as_timestamp(created_before, "created_before")
+    columns = _project(fields, TICKET_LIST_FIELDS)
+    _check_format(format)
+    if limit <= 0:
+        limit = 20
+    limit = min(limit, MAX_PAGE_SIZE)
+
+    filters = {
+        "status": statuses,
+        "priority": priorities,
+        "customer_status": customer_status,
+        "customer_id": customer_id,
+        "created_after": after,
+        "created_before": before,
+    }
+
+    where: List[str] = []
+    params: List[Any] = []
+    if statuses:
+        where.append(f"t.status IN ({', '.join('?' * len(statuses))})")
+        params.extend(statuses)
+    if priorities:
+        where.append(f"t.priority IN ({', '.join('?' * len(priorities))})")
+        params.extend(priorities)
+    if customer_status:
+        where.append("c.status = ?")
+        params.append(customer_status)
+    if customer_id is not None:
+        where.append("t.customer_id = ?")
+        params.append(customer_id)
+    if after:
+        where.append("t.created_at >= ?")
+        params.append(after)
+    if before:
+        where.append("t.created_at < ?")
+        params.append(before)
+    if cursor:
+        state = _decode_cursor(cursor, ints=("before_id",))
+        if state.get("filters") != filters:
+            raise ToolError("Cursor does not match the requested filters.")
+        where.append("t.id < ?")
+        params.append(state["before_id"])
+
+    sql = f"""
+        SELECT {_select(columns, required=("id",), expressions=_TICKET_LIST_COLUMNS)}
+        FROM tickets t
+        JOIN customers c ON c.id = t.customer_id
+    """
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY t.id DESC LIMIT ?"
+    params.append(limit + 1)
+
+    rows = _fetch_all(sql, tuple(params))
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor({"before_id": rows[-1]["id"], "filters": filters})
+
+    return {"tickets": _shape(rows, columns, format), "next_cursor": next_cursor}
+
+
+def _fts_query(text: str) -> str:
+    """
+    Turn free text into a safe FTS5 query: every word becomes a quoted term
+    and all terms must match, so user input can't inject FTS5 syntax.
+    """
+    terms = re.findall(r"\w+", text)
+    if not terms:
+        raise ToolError("Search query must contain at least one word.")
+    return " ".join(f'"{t}"' for t in terms)
+
+
+_SEARCH_COLUMNS = {
+    **{f: f"t.{f}" for f in TICKET_FIELDS},
+    "snippet": "snippet(tickets_fts, 0, '[', ']', '…', 12)",
+    "score": "bm25(tickets_fts)",
+}
+SEARCH_FIELDS = tuple(_SEARCH_COLUMNS)
+
+
+def search_tickets(
+    query: str,
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    limit: int = 20,
+    fields: Optional[List[str]] = None,
+    format: str = "rows",
+) -> Any:
+    """
+    Full-text search over ticket issues, best matches first (BM25).
+
+    Each result is a ticket row plus ``snippet`` (matched words in [brackets])
+    and ``score`` (BM25; lower is better). Requires the tickets_fts index
+    created by database_setup.py migrations. ``fields`` (see
+    SEARCH_FIELDS) / ``format`` work as in list_customers.
+    """
+    if status is not None and status not in TICKET_STATUSES:
+        raise ToolError(f"Invalid status: {status}")
+    if priority is not None and priority not in TICKET_PRIORITIES:
+        raise ToolError(f"Invalid priority: {priority}")
+    if limit <= 0:
+        limit = 20
+    limit = min(limit, MAX_PAGE_SIZE)
+    columns = _project(fields, SEARCH_FIELDS)
+    _check_format(format)
+
+    sql = f"""
+        SELECT {_select(columns, required=("score",), expressions=_SEARCH_COLUMNS)}
+        FROM tickets_fts
+        JOIN tickets t ON t.id = tickets_fts.rowid
+        WHERE tickets_fts MATCH ?
+    """
+    params: List[Any] = [_fts_query(query)]
+    if status:
+        sql += " AND t.status = ?"
+        params.append(status)
+    if priority:
+        sql += " AND t.priority = ?"
+        params.append(priority)
+    sql += " ORDER BY score LIMIT ?"
+    params.append(limit)
+
+    try:
+        return _shape(_fetch_all(sql, tuple(params)), columns, format)
+    except sqlite3.OperationalError as e:
+        if "tickets_fts" in str(e):
+            raise ToolError(
+                "Full-text index is missing; run `python database_setup.py --migrate`."
+            )
+        raise
+
+
+
 if __name__ == "__main__":
     print("DB path:", _db_path())
     try:
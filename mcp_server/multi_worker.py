@@ -0,0 +1,107 @@
+# multi_worker.py
+#
+# Run the MCP server as N worker processes over streamable HTTP. Uvicorn's
+# supervisor binds the listening socket once and every worker accepts from it,
+# so requests are spread across cores; all workers share support.db in WAL
+# mode. SIGINT/SIGTERM stop accepting, let in-flight requests finish (up to
+# --grace seconds) and then shut each worker's executor and pools down.
+
+import argparse
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+WORKERS_ENV = "MCP_WORKERS"
+DEFAULT_PORT = 8000
+DEFAULT_PROFILE = "wal"  # concurrent readers across processes need WAL
+
+
+def _worker_metrics_file(path: str) -> str:
+    """Per-worker Prometheus textfile, e.g. mcp.prom -> mcp-<pid>.prom."""
+    root, ext = os.path.splitext(path)
+    return f"{root}-{os.getpid()}{ext}"
+
+
+def create_app() -> Any:
+    """
+    Uvicorn factory run once in every worker: build the stateless
+    streamable-HTTP app and tie executor / pool / metrics lifetime to it.
+    """
+    import mcp_server
+    from mcp_tools import close_pool, configure_cache
+    from tool_metrics import METRICS_FILE_ENV, METRICS_INTERVAL_ENV, start_file_exporter
+
+    # The read cache is per process and a write in one worker cannot
+    # invalidate it in the others, so it would serve stale rows for up to
+    # CACHE_TTL. SQLite's page cache and WAL keep uncached reads cheap.
+    configure_cache(enabled=False)
+
+    # Any worker may receive any request, so no per-session server state.
+    mcp_server.mcp.settings.stateless_http = True
+    mcp_server.mcp.settings.json_response = True
+    app = mcp_server.mcp.streamable_http_app()
+    session_lifespan = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def lifespan(a: Any) -> AsyncIterator[None]:
+        metrics_file = os.environ.get(METRICS_FILE_ENV)
+        exporter = None
+        if metrics_file and mcp_server.metrics.enabled:
+            metrics_file = _worker_metrics_file(metrics_file)
+            interval = float(os.environ.get(METRICS_INTERVAL_ENV, "15"))
+            exporter = start_file_exporter(
+                mcp_server.metrics, metrics_file, interval, mcp_server._gauges
+            )
+        try:
+            async with session_lifespan(a):
+                yield
+        finally:
+            if exporter is not None:
+                exporter.set()
+                mcp_server.metrics.dump_prometheus(metrics_file, mcp_server._gauges())
+            mcp_server.executor.shutdown()
+            close_pool()
+
+    app.router.lifespan_context = lifespan
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the MCP server with several worker processes.")
+    parser.add_argument("--workers", type=int,
+                        default=int(os.environ.get(WORKERS_ENV, os.cpu_count() or 1)))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--db", help="database path (default: support.db in the repo root)")
+    parser.add_argument("--grace", type=float, default=10.0,
+                        help="seconds to let in-flight requests finish on shutdown")
+    args = parser.parse_args()
+    if args.workers <= 0:
+        parser.error("--workers must be positive")
+
+    import uvicorn  # installed with the mcp package
+
+    from mcp_tools import DB_PATH_ENV, DB_PROFILE_ENV, close_pool, configure_pool
+
+    # Workers inherit the environment; switch the database to WAL once here
+    # so they never race on the journal mode.
+    if args.db:
+        os.environ[DB_PATH_ENV] = os.path.abspath(args.db)
+    profile = os.environ.setdefault(DB_PROFILE_ENV, DEFAULT_PROFILE)
+    print("Database:", configure_pool(profile=profile).path, f"({profile})")
+    close_pool()
+
+    print(f"Starting {args.workers} MCP workers on http://{args.host}:{args.port}/mcp")
+    uvicorn.run(
+        "multi_worker:create_app",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=args.grace,
+        log_level="warning",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import asyncio
+import json
+import os
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+SINGLE_FLIGHT_ENV = "MCP_SINGLE_FLIGHT"  # set to "0" to disable coalescing
+
+
+def call_key(*args: Any, **kwargs: Any) -> str:
+    """Stable key for a call's arguments (dict order and list/tuple agnostic)."""
+    return json.dumps([args, kwargs], sort_keys=True, default=str)
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent async calls: while a call for ``key`` is in
+    flight, later callers with the same key await the same task instead of
+    starting another one, and all of them get its result (or exception).
+
+    Nothing is cached: the key is forgotten as soon as the call finishes.
+    Callers that are cancelled do not cancel the shared call.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None):
+        if enabled is None:
+            enabled = os.environ.get(SINGLE_FLIGHT_ENV, "1") != "0"
+        self.enabled = enabled
+        self._inflight: Dict[Tuple[str, Hashable], asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self._tools: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, tool: str, name: str) -> None:
+        with self._lock:
+            counters = self._tools.setdefault(tool, {"executed": 0, "coalesced": 0})
+            counters[name] += 1
+
+    async def do(
+        self,
+        tool: str,
+        key: Hashable,
+        fn: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Await ``fn()``, sharing it with concurrent callers using the same key."""
+        if not self.enabled:
+            return await fn()
+
+        flight_key = (tool, key)
+        task = self._inflight.get(flight_key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[flight_key] = task
+            task.add_done_callback(lambda t: self._done(flight_key, t))
+            self._count(tool, "executed")
+        else:
+            self._count(tool, "coalesced")
+        return await asyncio.shield(task)
+
+    def _done(self, flight_key: Tuple[str, Hashable], task: asyncio.Future) -> None:
+        if self._inflight.get(flight_key) is task:
+            del self._inflight[flight_key]
+        if not task.cancelled():
+            task.exception()  # retrieved even if every caller was cancelled
+
+    def forget(self) -> None:
+        """
+        Stop sharing the calls currently in flight: later callers start a new
+        call. Used after writes so readers never join a query that began
+        before the write committed.
+        """
+        self._inflight.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            tools = {name: dict(c) for name, c in self._tools.items()}
+        executed = sum(c["executed"] for c in tools.values())
+        coalesced = sum(c["coalesced"] for c in tools.values())
+        total = executed + coalesced
+        return {
+            "enabled": self.enabled,
+            "in_flight": len(self._inflight),
+            "executed": executed,
+            "coalesced": coalesced,
+            "coalesce_rate": coalesced / total if total else 0.0,
+            "tools": tools,
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._tools.clear()
@@ -0,0 +1,136 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+WORKERS_ENV = "MCP_TOOL_WORKERS"
+DEFAULT_WORKERS = 8  # matches the SQLite pool size in mcp_tools
+
+
+class ToolExecutor:
+    """
+    Runs blocking tool functions on a bounded thread pool so the event loop
+    stays free to serve other clients.
+
+    ``tool_limits`` caps how many calls of a given tool may be in the thread
+    pool at once (e.g. keep heavy reports from taking every worker); calls over
+    the limit wait on an asyncio semaphore. Per-tool counters track calls
+    waiting for their limit, queued for a worker thread and running.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        tool_limits: Optional[Dict[str, int]] = None,
+    ):
+        if max_workers is None:
+            max_workers = int(os.environ.get(WORKERS_ENV, DEFAULT_WORKERS))
+        if max_workers <= 0:
+            raise ValueError("max_workers must be positive")
+
+        self.max_workers = max_workers
+        self.tool_limits = dict(tool_limits or {})
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mcp-tool")
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._lock = threading.Lock()
+        self._tools: Dict[str, Dict[str, int]] = {}
+
+    def _counters(self, tool: str) -> Dict[str, int]:
+        counters = self._tools.get(tool)
+        if counters is None:
+            counters = self._tools[tool] = {
+                "waiting": 0,  # blocked on the per-tool limit
+                "queued": 0,  # submitted, waiting for a worker thread
+                "running": 0,
+                "completed": 0,
+                "failed": 0,
+                "max_waiting": 0,
+                "max_queued": 0,
+            }
+        return counters
+
+    def _change(self, tool: str, **deltas: int) -> None:
+        with self._lock:
+            counters = self._counters(tool)
+            for name, delta in deltas.items():
+                counters[name] += delta
+            counters["max_waiting"] = max(counters["max_waiting"], counters["waiting"])
+            counters["max_queued"] = max(counters["max_queued"], counters["queued"])
+
+    def _semaphore(self, tool: str) -> Optional[asyncio.Semaphore]:
+        limit = self.tool_limits.get(tool)
+        if limit is None:
+            return None
+        sem = self._semaphores.get(tool)
+        if sem is None:
+            sem = self._semaphores[tool] = asyncio.Semaphore(limit)
+        return sem
+
+    async def run(self, tool: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run ``fn(*args, **kwargs)`` in the pool, honouring ``tool``'s limit."""
+        async with self.limit(tool):
+            return await self.submit(tool, fn, *args, **kwargs)
+
+    @asynccontextmanager
+    async def limit(self, tool: str) -> AsyncIterator[None]:
+        """
+        Hold one of ``tool``'s slots for the block (no-op for unlimited tools).
+        Split from submit() so callers can take it before other resources.
+        """
+        sem = self._semaphore(tool)
+        if sem is None:
+            yield
+            return
+
+        self._change(tool, waiting=1)
+        try:
+            await sem.acquire()
+        finally:
+            self._change(tool, waiting=-1)
+        try:
+            yield
+        finally:
+            sem.release()
+
+    async def submit(self, tool: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        # Whoever takes ``claim`` first owns the "queued" slot: the worker when
+        # it starts, or the caller if it was cancelled before that happened.
+        claim = threading.Lock()
+
+        def work() -> Any:
+            if not claim.acquire(blocking=False):
+                return None
+            self._change(tool, queued=-1, running=1)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._change(tool, running=-1)
+
+        self._change(tool, queued=1)
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self._pool, work)
+        except BaseException:
+            if claim.acquire(blocking=False):
+                self._change(tool, queued=-1)
+            self._change(tool, failed=1)
+            raise
+        self._change(tool, completed=1)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            tools = {name: dict(c) for name, c in self._tools.items()}
+        return {
+            "max_workers": self.max_workers,
+            "tool_limits": dict(self.tool_limits),
+            "queued": sum(c["queued"] for c in tools.values()),
+            "running": sum(c["running"] for c in tools.values()),
+            "waiting": sum(c["waiting"] for c in tools.values()),
+            "tools": tools,
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
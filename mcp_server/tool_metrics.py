@@ -0,0 +1,230 @@
+import bisect
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+METRICS_ENV = "MCP_METRICS"  # set to "0" to disable instrumentation
+METRICS_FILE_ENV = "MCP_METRICS_FILE"  # Prometheus textfile target
+METRICS_INTERVAL_ENV = "MCP_METRICS_INTERVAL"  # seconds between file dumps
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class Histogram:
+    """Fixed-bucket histogram with quantile estimates (Prometheus style)."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Estimate the q-quantile by linear interpolation inside its bucket."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+    def cumulative(self) -> Iterable[Tuple[str, int]]:
+        total = 0
+        for bound, n in zip(self.buckets, self.counts):
+            total += n
+            yield repr(bound), total
+        yield "+Inf", self.count
+
+
+def _count_rows(result: Any) -> int:
+    """Best-effort row count of a tool result (lists, pages, compact tables)."""
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, dict):
+        for key in ("rows", "customers", "tickets", "created"):
+            value = result.get(key)
+            if isinstance(value, list):
+                return len(value)
+            if isinstance(value, dict):
+                return _count_rows(value)
+        return 0 if "error" in result else 1
+    return 0 if result is None else 1
+
+
+def measure(result: Any) -> Tuple[int, int]:
+    """
+    (rows, JSON payload bytes) of a tool result. This encodes the result, so
+    call it where the tool ran (a worker thread), not on the event loop.
+    """
+    return _count_rows(result), len(json.dumps(result, default=str))
+
+
+class ToolMetrics:
+    """
+    Per-tool call counts, errors by type, latency histograms, rows returned
+    and payload bytes. ``record`` is a no-op when disabled; callers should
+    also check ``enabled`` before taking timestamps.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None):
+        if enabled is None:
+            enabled = os.environ.get(METRICS_ENV, "1") != "0"
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._tools: Dict[str, Dict[str, Any]] = {}
+
+    def _tool(self, tool: str) -> Dict[str, Any]:
+        entry = self._tools.get(tool)
+        if entry is None:
+            entry = self._tools[tool] = {
+                "calls": 0,
+                "errors": {},
+                "latency": Histogram(),
+                "rows": 0,
+                "payload_bytes": 0,
+            }
+        return entry
+
+    def record(
+        self,
+        tool: str,
+        seconds: float,
+        result: Any = None,
+        error: Optional[str] = None,
+        rows: Optional[int] = None,
+        payload: int = 0,
+    ) -> None:
+        """
+        Record one call; ``error`` is the exception type name, if any.
+        ``rows`` overrides the row count derived from ``result`` (streams).
+        ``payload`` is the size from measure(): record() never encodes.
+        """
+        if not self.enabled:
+            return
+        if error is None and isinstance(result, dict) and "error" in result:
+            error = "ToolError"
+        if error is not None:
+            rows = payload = 0
+        elif rows is None:
+            rows = _count_rows(result)
+
+        with self._lock:
+            entry = self._tool(tool)
+            entry["calls"] += 1
+            entry["latency"].observe(seconds)
+            entry["rows"] += rows
+            entry["payload_bytes"] += payload
+            if error is not None:
+                entry["errors"][error] = entry["errors"].get(error, 0) + 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._tools.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-friendly view: counts plus p50/p95/p99 latency in ms."""
+        with self._lock:
+            out = {}
+            for tool, e in sorted(self._tools.items()):
+                h: Histogram = e["latency"]
+                out[tool] = {
+                    "calls": e["calls"],
+                    "errors": dict(e["errors"]),
+                    "rows": e["rows"],
+                    "payload_bytes": e["payload_bytes"],
+                    "latency_ms": {
+                        "p50": round(h.quantile(0.50) * 1000, 3),
+                        "p95": round(h.quantile(0.95) * 1000, 3),
+                        "p99": round(h.quantile(0.99) * 1000, 3),
+                        "mean": round(h.sum / h.count * 1000, 3) if h.count else 0.0,
+                        "max": round(h.max * 1000, 3),
+                    },
+                }
+            return {"enabled": self.enabled, "tools": out}
+
+    def render_prometheus(self, extra: Optional[Dict[str, float]] = None) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+
+        def header(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            tools = sorted(self._tools.items())
+
+            header("mcp_tool_calls_total", "counter", "Tool calls handled.")
+            for tool, e in tools:
+                lines.append(f'mcp_tool_calls_total{{tool="{tool}"}} {e["calls"]}')
+
+            header("mcp_tool_errors_total", "counter", "Tool calls that failed, by error type.")
+            for tool, e in tools:
+                for kind, n in sorted(e["errors"].items()):
+                    lines.append(f'mcp_tool_errors_total{{tool="{tool}",type="{kind}"}} {n}')
+
+            header("mcp_tool_rows_total", "counter", "Rows returned by tool calls.")
+            for tool, e in tools:
+                lines.append(f'mcp_tool_rows_total{{tool="{tool}"}} {e["rows"]}')
+
+            header("mcp_tool_payload_bytes_total", "counter", "JSON bytes returned by tool calls.")
+            for tool, e in tools:
+                lines.append(f'mcp_tool_payload_bytes_total{{tool="{tool}"}} {e["payload_bytes"]}')
+
+            header("mcp_tool_latency_seconds", "histogram", "Tool call latency.")
+            for tool, e in tools:
+                h: Histogram = e["latency"]
+                for le, n in h.cumulative():
+                    lines.append(f'mcp_tool_latency_seconds_bucket{{tool="{tool}",le="{le}"}} {n}')
+                lines.append(f'mcp_tool_latency_seconds_sum{{tool="{tool}"}} {h.sum}')
+                lines.append(f'mcp_tool_latency_seconds_count{{tool="{tool}"}} {h.count}')
+
+        for name, value in sorted((extra or {}).items()):
+            header(name, "gauge", name.replace("_", " ") + ".")
+            lines.append(f"{name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def dump_prometheus(self, path: str, extra: Optional[Dict[str, float]] = None) -> None:
+        """Atomically write the Prometheus text to ``path`` (textfile collector)."""
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus(extra))
+        os.replace(tmp, path)
+
+
+def start_file_exporter(
+    metrics: ToolMetrics,
+    path: str,
+    interval: float,
+    extra: Optional[Callable[[], Dict[str, float]]] = None,
+) -> threading.Event:
+    """
+    Dump ``metrics`` to ``path`` every ``interval`` seconds from a daemon
+    thread. ``extra`` is an optional callable returning extra gauges. Set the
+    returned event to stop the thread.
+    """
+    stop = threading.Event()
+
+    def loop() -> None:
+        while not stop.wait(interval):
+            metrics.dump_prometheus(path, extra() if extra else None)
+
+    threading.Thread(target=loop, name="mcp-metrics-exporter", daemon=True).start()
+    return stop
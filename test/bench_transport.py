@@ -0,0 +1,74 @@
+# bench_transport.py
+# -----------------------
+# Per-call overhead of the data agent's transports: in-process DirectTransport
+# vs. one persistent MCP client session over stdio (and optionally HTTP).
+#
+#   python test/bench_transport.py --calls 500
+#   python test/bench_transport.py --url http://127.0.0.1:8000/mcp
+#
+# Prints mean / p50 / p95 latency of sequential calls, and the throughput of
+# the same calls pipelined over the session with call_many().
+
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agents.data_transport import DirectTransport, MCPClientTransport
+
+
+# -----------------------
+# Helpers
+# -----------------------
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def bench(name, transport, calls):
+    args = [("get_customer", {"customer_id": 1 + i % 15}) for i in range(calls)]
+    transport.call("get_customer", customer_id=1)  # warm up / connect
+
+    samples = []
+    for tool, kwargs in args:
+        start = time.perf_counter()
+        transport.call(tool, **kwargs)
+        samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    transport.call_many(args)
+    pipelined = time.perf_counter() - start
+
+    print(f"{name:<10} {statistics.mean(samples) * 1e6:>10.0f} {percentile(samples, 0.5) * 1e6:>10.0f} "
+          f"{percentile(samples, 0.95) * 1e6:>10.0f} {calls / pipelined:>14.0f}")
+
+
+# -----------------------
+# Main
+# -----------------------
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark data agent transports.")
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--url", help="also benchmark an HTTP server at this MCP endpoint")
+    args = parser.parse_args()
+
+    os.chdir(Path(__file__).resolve().parent.parent)
+    print(f"{'transport':<10} {'mean us':>10} {'p50 us':>10} {'p95 us':>10} {'pipelined/s':>14}")
+
+    transports = [("direct", DirectTransport()), ("stdio", MCPClientTransport())]
+    if args.url:
+        transports.append(("http", MCPClientTransport(url=args.url)))
+    for name, transport in transports:
+        try:
+            bench(name, transport, args.calls)
+        finally:
+            transport.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# bench_workers.py
+# -----------------------
+# Throughput of the multi-worker MCP server for 1, 2, 4... workers.
+#
+#   python test/bench_workers.py --workers 1 2 4 --clients 32 --seconds 10
+#
+# Each run starts mcp_server/multi_worker.py on a copy of support.db, drives it
+# with concurrent HTTP clients calling read tools, and prints requests/second.
+
+
+import argparse
+import json
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+ROOT = Path(__file__).resolve().parent.parent
+HEADERS = {"Content-Type": "application/json", "Accept": "application/json, text/event-stream"}
+
+# (tool, arguments) mix sent by the clients
+CALLS = [
+    ("tool_get_customer_history", lambda: {"customer_id": random.randint(1, 15)}),
+    ("tool_list_customers", lambda: {"limit": 50}),
+    ("tool_list_tickets", lambda: {"status": "open", "limit": 50}),
+]
+
+
+# -----------------------
+# Helpers
+# -----------------------
+def call_tool(session, url, name, arguments):
+    body = {"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+            "params": {"name": name, "arguments": arguments}}
+    resp = session.post(url, data=json.dumps(body), headers=HEADERS, timeout=30)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def wait_ready(url, timeout=20.0):
+    deadline = time.time() + timeout
+    with requests.Session() as session:
+        while time.time() < deadline:
+            try:
+                call_tool(session, url, "tool_get_customer", {"customer_id": 1})
+                return
+            except requests.RequestException:
+                time.sleep(0.2)
+    raise RuntimeError(f"server at {url} did not come up")
+
+
+def drive(url, clients, seconds):
+    """Run ``clients`` threads for ``seconds``; return (requests, errors)."""
+    stop = time.time() + seconds
+    counts = [0] * clients
+    errors = [0] * clients
+
+    def client(i):
+        with requests.Session() as session:
+            while time.time() < stop:
+                name, make_args = random.choice(CALLS)
+                try:
+                    result = call_tool(session, url, name, make_args())
+                    if "error" in result or result["result"].get("isError"):
+                        errors[i] += 1
+                except requests.RequestException:
+                    errors[i] += 1
+                counts[i] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sum(counts), sum(errors)
+
+
+def run(workers, clients, seconds, port, db):
+    url = f"http://127.0.0.1:{port}/mcp"
+    server = subprocess.Popen(
+        [sys.executable, "multi_worker.py", "--workers", str(workers),
+         "--port", str(port), "--db", db],
+        cwd=ROOT / "mcp_server",
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(url)
+        total, errors = drive(url, clients, seconds)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+    return total / seconds, errors
+
+
+# -----------------------
+# Main
+# -----------------------
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark multi-worker MCP server throughput.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "support.db")
+        shutil.copy(ROOT / "support.db", db)
+
+        print(f"{'workers':>8} {'req/s':>10} {'speedup':>8} {'errors':>7}")
+        baseline = None
+        for workers in args.workers:
+            rps, errors = run(workers, args.clients, args.seconds, args.port, db)
+            baseline = baseline or rps
+            print(f"{workers:>8} {rps:>10.1f} {rps / baseline:>7.2f}x {errors:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+import time
+
 import pytest
 
 from agents.data_agent import CustomerDataAgent
@@ -65,9 +67,9 @@ def test_scenario_multi_step(setup_agents):
     assert isinstance(result.final_reply, str)
     assert len(result.final_reply) > 0
 
-    # Ensure histories collected
-    assert "premium_histories" in result.extra
-    assert isinstance(result.extra["premium_histories"], list)
+    # Ensure pre-aggregated ticket stats collected
+    assert "ticket_stats" in result.extra
+    assert isinstance(result.extra["ticket_stats"]["customers"], list)
 
 
 # -----------------------------------------------------------------------------------
@@ -81,3 +83,366 @@ def test_data_agent(setup_agents):
 
     hist = data_agent.fetch_customer_history(1)
     assert isinstance(hist, dict)
+
+
+# -----------------------------------------------------------------------------------
+# DataAgent over a real MCP client session (stdio)
+# -----------------------------------------------------------------------------------
+def test_data_agent_over_mcp_session():
+    from agents.data_transport import DirectTransport, MCPClientTransport, ToolCallError
+
+    remote = CustomerDataAgent(transport=MCPClientTransport())
+    local = CustomerDataAgent(transport=DirectTransport())
+    try:
+        assert remote.fetch_customer(1) == local.fetch_customer(1)
+        assert remote.fetch_customer_history(2) == local.fetch_customer_history(2)
+
+        results = remote.transport.call_many([
+            ("get_customer", {"customer_id": 3}),
+            ("list_tickets", {"status": "open", "limit": 5}),
+            ("update_customer", {"customer_id": 1, "data": {"status": "bogus"}}),
+        ])
+        assert results[0]["id"] == 3
+        assert "tickets" in results[1]
+        assert isinstance(results[2], ToolCallError)
+    finally:
+        remote.close()
+
+    # Both transports report tool errors the same way
+    with pytest.raises(ToolCallError):
+        local.transport.call("update_customer", customer_id=999999, data={"name": "Nobody"})
+
+
+def test_mcp_transport_does_not_resend_writes():
+    from agents.data_transport import MCPClientTransport
+
+    class _DroppingSession:
+        calls = []
+
+        async def call_tool(self, name, args):
+            self.calls.append(name)
+            raise BrokenPipeError()
+
+    transport = MCPClientTransport(retries=2)
+    session = _DroppingSession()
+
+    async def connect():
+        return session
+
+    transport._connect = connect
+    try:
+        with pytest.raises(BrokenPipeError):
+            transport.call("create_ticket", customer_id=1, issue="once")
+        assert session.calls == ["tool_create_ticket"]
+        with pytest.raises(BrokenPipeError):
+            transport.call("get_customer", customer_id=1)
+        assert session.calls[1:] == ["tool_get_customer"] * 3
+    finally:
+        transport.close()
+
+
+def test_mcp_transport_timeout_fails_only_that_call():
+    import asyncio
+    from types import SimpleNamespace
+
+    from agents.data_transport import MCPClientTransport
+
+    class _Session:
+        calls = []
+
+        async def call_tool(self, name, args):
+            self.calls.append(name)
+            if name == "tool_get_ticket_stats":
+                await asyncio.sleep(10)
+            await asyncio.sleep(0.8)
+            return SimpleNamespace(isError=False, content=[], structuredContent={"result": {"id": 1}})
+
+    transport = MCPClientTransport(timeout=1.0, retries=2)
+    session = _Session()
+    dropped = []
+
+    async def connect():
+        return session
+
+    async def disconnect(s):
+        dropped.append(s)
+
+    transport._connect = connect
+    transport._disconnect = disconnect
+
+    async def main():
+        # The second call is still in flight when the first one times out
+        slow = asyncio.ensure_future(transport._call("get_ticket_stats", {}))
+        await asyncio.sleep(0.4)
+        fast = await transport._call("get_customer", {"customer_id": 1})
+        return fast, await asyncio.gather(slow, return_exceptions=True)
+
+    try:
+        fast, (slow,) = transport._submit(main()).result()
+        assert fast == {"id": 1}
+        assert isinstance(slow, asyncio.TimeoutError)
+        assert session.calls == ["tool_get_ticket_stats", "tool_get_customer"]
+        assert dropped == []
+    finally:
+        transport.close()
+
+
+# -----------------------------------------------------------------------------------
+# DataAgent batching: concurrent lookups become bulk calls, cached per request
+# -----------------------------------------------------------------------------------
+class _CountingTransport:
+    def __init__(self):
+        from agents.data_transport import DirectTransport
+        self.inner = DirectTransport()
+        self.calls = []
+
+    def call(self, tool, **kwargs):
+        self.calls.append(tool)
+        time.sleep(0.01)  # let concurrent lookups pile up behind the first batch
+        return self.inner.call(tool, **kwargs)
+
+    def close(self):
+        pass
+
+
+def test_data_agent_batches_concurrent_lookups():
+    from concurrent.futures import ThreadPoolExecutor
+
+    transport = _CountingTransport()
+    agent = CustomerDataAgent(transport=transport)
+    ids = [1, 2, 3, 4, 5, 1, 2, 3] * 4
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        customers = list(pool.map(agent.fetch_customer, ids))
+
+    assert [c["id"] for c in customers] == ids
+    assert set(transport.calls) == {"get_customers_bulk"}
+    assert len(transport.calls) < len(ids) // 4
+    stats = agent.loader_stats()["customers"]
+    assert stats["loads"] == len(ids)
+    assert stats["deduped"] > 0
+    assert agent.fetch_customer(999999) is None
+
+
+def test_data_agent_request_scope_caches_lookups():
+    transport = _CountingTransport()
+    agent = CustomerDataAgent(transport=transport)
+
+    with agent.request_scope():
+        history = agent.fetch_customer_history(2)
+        assert agent.fetch_customer(2) == history["customer"]
+        assert agent.fetch_customer_history(2) is history
+    assert transport.calls == ["get_customer_histories_bulk"]
+
+    agent.fetch_customer(2)  # outside the scope: loaded again
+    assert transport.calls[-1] == "get_customers_bulk"
+
+
+# -----------------------------------------------------------------------------------
+# Shared LLM client: retries, errors and metrics (no model needed)
+# -----------------------------------------------------------------------------------
+class _FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.posts = []
+
+    def post(self, url, json=None, timeout=None, stream=False):
+        import requests
+
+        self.posts.append((url, json, timeout))
+        item = self.responses.pop(0)
+        if isinstance(item, Exception):
+            raise item
+        resp = requests.Response()
+        resp.status_code, resp._content = item
+        resp._content_consumed = True
+        return resp
+
+    def close(self):
+        pass
+
+
+def test_llm_client_retries_and_records_metrics():
+    import requests
+
+    from agents.llm_client import LLMClient, LLMError
+
+    session = _FakeSession([
+        requests.ConnectionError("refused"),
+        (503, b"busy"),
+        (200, b'{"response": "hello"}'),
+    ])
+    llm = LLMClient(url="http://llm/api/generate", model="m", retries=2, backoff=0.001,
+                    timeout=9, session=session)
+    assert llm.generate("hi") == "hello"
+    assert session.posts[-1][1] == {"model": "m", "prompt": "hi", "stream": False}
+    assert session.posts[-1][2] == (llm.connect_timeout, 9)
+
+    stats = llm.stats()
+    assert stats["calls"] == 1 and stats["retries"] == 2 and stats["failures"] == 0
+    assert stats["errors"] == {"ConnectionError": 1, "_RetryableStatus": 1}
+
+    failing = LLMClient(retries=1, backoff=0.001, session=_FakeSession([(502, b""), (502, b"")]))
+    with pytest.raises(LLMError):
+        failing.generate("hi")
+    bad_request = LLMClient(retries=3, session=_FakeSession([(400, b"bad")]))
+    with pytest.raises(LLMError):
+        bad_request.generate("hi")
+    assert bad_request.stats()["retries"] == 0
+
+
+def test_agents_share_injected_llm_client():
+    from agents.llm_client import LLMClient
+
+    llm = LLMClient(model="tiny", session=_FakeSession([(200, b'{"response": "ok"}')]))
+    support = SupportAgentLLM(CustomerDataAgent(), llm=llm)
+    router = RouterAgentLLM(support.data_agent, support, llm=llm)
+    assert support.account_help({"id": 1}, "help") == "ok"
+    assert router.model == support.model == "tiny"
+
+
+def test_router_streams_reply_and_measures_first_token():
+    import asyncio
+
+    from agents.llm_client import LLMClient
+
+    ndjson = b'{"response": "Hel"}\n{"response": "lo"}\n{"response": "", "done": true}\n'
+    session = _FakeSession([(200, ndjson), (200, ndjson)])
+    llm = LLMClient(session=session)
+    data_agent = CustomerDataAgent()
+    router = RouterAgentLLM(data_agent, SupportAgentLLM(data_agent, llm=llm), llm=llm)
+
+    result = router.handle_query("Get customer information for ID 5", stream=True)
+    assert result.streaming and result.final_reply is None
+    assert list(result.stream()) == ["Hel", "lo"]
+    assert result.final_reply == "Hello"
+    assert result.first_token_latency is not None
+    assert session.posts[0][1]["stream"] is True
+
+    async def collect():
+        res = router.handle_query("Get customer information for ID 5", stream=True)
+        return [c async for c in res.astream()], res.final_reply
+
+    assert asyncio.run(collect()) == (["Hel", "lo"], "Hello")
+    assert llm.stats()["first_token_ms"]["max"] >= 0
+
+
+def test_router_classifies_by_keywords_without_llm():
+    from agents.llm_client import LLMClient
+
+    session = _FakeSession([])
+    router = RouterAgentLLM(CustomerDataAgent(), None, llm=LLMClient(session=session))
+    assert router.classify("I want to cancel my subscription") == "negotiation_escalation"
+    assert router.classify("Update my email and show my ticket history") == "multi_intent"
+    decision = router.classify_query("Show me all customers with open tickets")
+    assert decision["scenario"] == "multi_step_coordination" and decision["method"] == "keywords"
+    assert session.posts == []
+
+
+def test_router_escalates_low_confidence_queries_to_llm():
+    from agents.llm_client import LLMClient
+
+    session = _FakeSession([(200, b'{"response": "{\\"scenario\\": \\"negotiation_escalation\\"}"}'),
+                            (200, b'{"response": "no idea"}'),
+                            (500, b"")])
+    router = RouterAgentLLM(CustomerDataAgent(), None, llm=LLMClient(session=session, retries=0))
+
+    decision = router.classify_query("Something is wrong")
+    assert decision["scenario"] == "negotiation_escalation" and decision["method"] == "llm"
+    assert len(decision["path"]) == 2
+    payload = session.posts[0][1]
+    assert payload["format"]["properties"]["scenario"]["enum"][0] == "task_allocation"
+    assert payload["options"]["num_predict"] <= 32
+
+    # Unparseable reply or LLM failure: keep the keyword guess
+    for _ in range(2):
+        decision = router.classify_query("Something is wrong")
+        assert decision["scenario"] == "task_allocation" and decision["method"] == "keywords"
+
+
+# -----------------------------------------------------------------------------------
+# Token-budgeted prompts
+# -----------------------------------------------------------------------------------
+def test_prompt_builder_fits_ranked_tickets_in_budget(capsys):
+    from agents.prompt_builder import PromptBuilder, estimate_tokens
+
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("id|name") < estimate_tokens("id|name|email|phone")
+
+    tickets = [{"id": i, "customer_id": 1, "issue": f"Printer jam number {i}", "status": "resolved",
+                "priority": "low", "created_at": f"2025-01-{i:02d}"} for i in range(1, 29)]
+    tickets.append({"id": 99, "customer_id": 1, "issue": "Refund not received", "status": "open",
+                    "priority": "medium", "created_at": "2024-01-01"})
+    builder = PromptBuilder(budget=120)
+    prompt, size = builder.build("t", "Request: {query}\n{tickets}\nAnswer.", tickets, "refund please")
+
+    assert size["tokens"] <= 120 == size["budget"]
+    assert 0 < size["tickets"] < size["tickets_total"] == 29
+    assert prompt.splitlines()[1:3] == ["id|status|priority|created_at|issue",
+                                        "99|open|medium|2024-01-01|Refund not received"]
+    assert "customer_id" not in prompt and "less relevant tickets omitted" in prompt
+    assert builder.stats()["t"]["truncated"] == 1
+    assert "[prompt-builder] t: ~" in capsys.readouterr().out
+
+
+def test_support_prompts_render_compact_history():
+    from agents.llm_client import LLMClient
+
+    session = _FakeSession([(200, b'{"response": "ok"}')])
+    data_agent = CustomerDataAgent()
+    support = SupportAgentLLM(data_agent, llm=LLMClient(session=session))
+    history = data_agent.fetch_customer_history(1)
+
+    assert support.billing_escalation(history, "cancel") == "ok"
+    prompt = session.posts[0][1]["prompt"]
+    assert "{'" not in prompt and "updated_at" not in prompt
+    assert f"1|{history['customer']['name']}|" in prompt
+    assert support.prompts.stats()["billing_escalation"]["calls"] == 1
+
+
+# -----------------------------------------------------------------------------------
+# Persistent LLM response cache
+# -----------------------------------------------------------------------------------
+def test_llm_cache_hits_expiry_and_eviction(tmp_path):
+    from agents.llm_cache import LLMResponseCache
+
+    cache = LLMResponseCache(path=tmp_path / "llm.db", ttl=60, max_entries=2)
+    cache.put("m", "Hello\n   world", "reply", tags=["customer:1"])
+    assert cache.get("m", "Hello world") == "reply"  # whitespace-normalized
+    assert cache.get("other-model", "Hello world") is None
+    assert cache.get("m", "Hello world", {"temperature": 0}) is None
+
+    cache.put("m", "second", "r2")
+    cache.get("m", "Hello world")  # touch: "second" is now least recently used
+    cache.put("m", "third", "r3")
+    assert cache.get("m", "second") is None
+    assert cache.stats()["evictions"] == 1
+
+    assert cache.invalidate("customer:1") == 1
+    assert cache.get("m", "Hello world") is None
+
+    expired = LLMResponseCache(path=tmp_path / "llm.db", ttl=0)
+    assert expired.get("m", "third") is None
+    stats = cache.stats()
+    assert stats["hits"] == 2 and 0 < stats["hit_rate"] < 1
+
+
+def test_llm_client_serves_repeat_prompts_from_cache(tmp_path):
+    from agents.llm_cache import LLMResponseCache
+    from agents.llm_client import LLMClient
+
+    session = _FakeSession([(200, b'{"response": "first"}'), (200, b'{"response": "second"}')])
+    llm = LLMClient(session=session, cache=LLMResponseCache(path=tmp_path / "llm.db"))
+    data_agent = CustomerDataAgent()
+    support = SupportAgentLLM(data_agent, llm=llm)
+    customer = data_agent.fetch_customer(1)
+
+    assert support.account_help(customer, "help") == "first"
+    assert support.account_help(customer, "help") == "first"
+    assert list(support.account_help(customer, "help", stream=True)) == ["first"]
+    assert len(session.posts) == 1
+    assert llm.stats()["cache"]["hits"] == 2
+
+    # Changing the customer through the data agent drops the cached reply
+    data_agent.update_customer(1, {"phone": customer["phone"]})
+    assert support.account_help(customer, "help") == "second"
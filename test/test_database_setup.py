@@ -0,0 +1,124 @@
+import pytest
+
+from database_setup import DatabaseSetup, MIGRATIONS
+
+
+@pytest.fixture
+def db(tmp_path):
+    setup = DatabaseSetup(str(tmp_path / "support.db"))
+    setup.connect()
+    setup.create_tables()
+    setup.create_triggers()
+    setup.insert_sample_data()
+    yield setup
+    setup.close()
+
+
+def _plan(db, sql, params=()):
+    db.cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+    return " | ".join(row[3] for row in db.cursor.fetchall())
+
+
+def test_migrate_is_idempotent(db):
+    assert db.schema_version() == 0
+    applied = db.migrate()
+    assert applied == [m[0] for m in MIGRATIONS]
+    assert db.schema_version() == MIGRATIONS[-1][0]
+
+    assert db.migrate() == []
+    db.cursor.execute("SELECT COUNT(*) FROM schema_migrations")
+    assert db.cursor.fetchone()[0] == len(MIGRATIONS)
+
+
+def test_setup_rerun_keeps_superseded_indexes_dropped(db):
+    db.migrate()
+    db.create_tables()
+    db.cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'tickets'")
+    names = {row[0] for row in db.cursor.fetchall()}
+    assert "idx_tickets_customer_id" not in names and "idx_tickets_status" not in names
+    assert {"idx_tickets_customer_created", "idx_tickets_status_priority"} <= names
+
+
+def test_history_query_uses_composite_index_without_sort(db):
+    db.migrate()
+    plan = _plan(
+        db,
+        """
+        SELECT id, customer_id, issue, status, priority, created_at
+        FROM tickets
+        WHERE customer_id = ?
+        ORDER BY created_at DESC, id DESC
+        """,
+        (1,),
+    )
+    assert "idx_tickets_customer_created" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_status_priority_filter_uses_composite_index(db):
+    db.migrate()
+    plan = _plan(
+        db,
+        "SELECT id FROM tickets WHERE status = ? AND priority = ?",
+        ("open", "high"),
+    )
+    assert "idx_tickets_status_priority (status=? AND priority=?)" in plan
+
+
+def test_fts_index_tracks_ticket_changes(db):
+    db.migrate()
+
+    def matches(term):
+        db.cursor.execute(
+            "SELECT rowid FROM tickets_fts WHERE tickets_fts MATCH ? ORDER BY rowid", (term,)
+        )
+        return [row[0] for row in db.cursor.fetchall()]
+
+    assert len(matches("payment")) == 1
+
+    db.cursor.execute(
+        "INSERT INTO tickets (customer_id, issue, priority) VALUES (1, 'Refund payment twice', 'high')"
+    )
+    new_id = db.cursor.lastrowid
+    assert new_id in matches("refund")
+
+    db.cursor.execute("UPDATE tickets SET issue = 'Invoice address wrong' WHERE id = ?", (new_id,))
+    assert new_id not in matches("refund")
+    assert new_id in matches("invoice")
+
+    db.cursor.execute("DELETE FROM tickets WHERE id = ?", (new_id,))
+    assert new_id not in matches("invoice")
+    db.conn.commit()
+
+
+def test_search_tickets_tool(db):
+    from mcp_server import mcp_tools
+
+    db.migrate()
+    mcp_tools.configure_pool(db_path=db.db_path)
+    try:
+        results = mcp_tools.search_tickets("payment failing")
+        assert [r["issue"] for r in results] == ["Payment processing failing for all transactions"]
+        assert "[Payment]" in results[0]["snippet"]
+
+        # Porter stemming: "requests" matches "request"
+        assert len(mcp_tools.search_tickets("requests")) == 5
+        assert all(r["status"] == "open" for r in mcp_tools.search_tickets("feature", status="open"))
+        # FTS5 syntax in user input is neutralised rather than raising
+        assert mcp_tools.search_tickets('login" OR "x') == []
+
+        with pytest.raises(mcp_tools.ToolError):
+            mcp_tools.search_tickets("   ")
+    finally:
+        mcp_tools.configure_pool()
+
+
+def test_search_tickets_without_migration(db):
+    from mcp_server import mcp_tools
+
+    mcp_tools.configure_pool(db_path=db.db_path)
+    try:
+        with pytest.raises(mcp_tools.ToolError, match="migrate"):
+            mcp_tools.search_tickets("payment")
+    finally:
+        mcp_tools.configure_pool()
@@ -0,0 +1,425 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+import mcp_server
+from admission import AdmissionController, Overloaded
+from single_flight import SingleFlight
+from tool_executor import ToolExecutor
+from tool_metrics import Histogram, ToolMetrics
+
+
+@pytest.fixture
+def scratch_db(tmp_path):
+    """Point the server at a copy of support.db so writes never touch the tracked file."""
+    import shutil
+
+    import mcp_tools
+
+    db = tmp_path / "support.db"
+    shutil.copy(mcp_tools._db_path(), db)
+    mcp_tools.configure_pool(db_path=db)
+    mcp_tools.clear_cache()
+    try:
+        yield db
+    finally:
+        mcp_tools.configure_pool()
+        mcp_tools.clear_cache()
+
+
+def test_tools_are_async_and_map_errors():
+    customer = asyncio.run(mcp_server.tool_get_customer(1))
+    assert customer["id"] == 1
+
+    res = asyncio.run(mcp_server.tool_create_ticket(1, "   "))
+    assert "error" in res
+
+
+def test_executor_runs_calls_in_parallel():
+    executor = ToolExecutor(max_workers=4)
+    barrier = threading.Barrier(4, timeout=2)
+
+    def blocking(i):
+        barrier.wait()  # only returns once all four calls run concurrently
+        return i
+
+    async def main():
+        return await asyncio.gather(*(executor.run("t", blocking, i) for i in range(4)))
+
+    try:
+        assert asyncio.run(main()) == [0, 1, 2, 3]
+        stats = executor.stats()["tools"]["t"]
+        assert stats["completed"] == 4
+        assert stats["running"] == stats["queued"] == 0
+    finally:
+        executor.shutdown()
+
+
+def test_executor_enforces_per_tool_limit():
+    executor = ToolExecutor(max_workers=4, tool_limits={"slow": 1})
+    active = []
+    peak = []
+
+    def slow():
+        active.append(1)
+        peak.append(len(active))
+        time.sleep(0.02)
+        active.pop()
+
+    async def main():
+        await asyncio.gather(*(executor.run("slow", slow) for _ in range(3)))
+
+    try:
+        asyncio.run(main())
+        assert max(peak) == 1
+        assert executor.stats()["tools"]["slow"]["max_waiting"] == 2
+    finally:
+        executor.shutdown()
+
+
+def test_executor_counts_failures():
+    executor = ToolExecutor(max_workers=1)
+
+    def boom():
+        raise ValueError("boom")
+
+    try:
+        with pytest.raises(ValueError):
+            asyncio.run(executor.run("boom", boom))
+        assert executor.stats()["tools"]["boom"]["failed"] == 1
+    finally:
+        executor.shutdown()
+
+
+def test_batch_runs_reads_and_writes_in_order(scratch_db):
+    results = asyncio.run(mcp_server.tool_batch([
+        {"tool": "get_customer", "args": {"customer_id": 2}},
+        {"tool": "tool_update_customer", "args": {"customer_id": 2, "data": {"phone": "+1-555-4242"}}},
+        {"tool": "create_ticket", "args": {"customer_id": 999999, "issue": "orphan"}},
+        {"tool": "create_ticket", "args": {"customer_id": 2, "issue": "batched ticket"}},
+        {"tool": "get_customer_history", "args": {"customer_id": 2}},
+        {"tool": "get_ticket_stats", "args": {"customer_status": "active"}},
+        {"tool": "drop_tables", "args": {}},
+        {"tool": "get_customer", "args": {"nope": 1}},
+    ]))
+
+    assert [r["tool"] for r in results] == [
+        "get_customer", "update_customer", "create_ticket", "create_ticket",
+        "get_customer_history", "get_ticket_stats", "drop_tables", "get_customer",
+    ]
+    # Results follow request order: the leading read sees the old row
+    assert results[0]["result"]["phone"] != "+1-555-4242"
+    assert results[1]["result"]["phone"] == "+1-555-4242"
+    assert "does not exist" in results[2]["error"]
+    ticket_id = results[3]["result"]["id"]
+    assert ticket_id in {t["id"] for t in results[4]["result"]["tickets"]}
+    assert "customers" in results[5]["result"]
+    assert "unknown tool" in results[6]["error"]
+    assert "error" in results[7]
+
+
+def test_batch_reads_between_writes_see_earlier_writes_only(scratch_db):
+    results = asyncio.run(mcp_server.tool_batch([
+        {"tool": "update_customer", "args": {"customer_id": 5, "data": {"phone": "+1-555-0001"}}},
+        {"tool": "get_customer", "args": {"customer_id": 5}},
+        {"tool": "update_customer", "args": {"customer_id": 5, "data": {"phone": "+1-555-0002"}}},
+        {"tool": "get_customer", "args": {"customer_id": 5}},
+    ]))
+    assert [r["result"]["phone"] for r in results] == ["+1-555-0001"] * 2 + ["+1-555-0002"] * 2
+
+
+def test_batch_failed_write_does_not_leak_partial_changes(scratch_db):
+    import mcp_tools
+
+    before = len(mcp_tools.get_customer_history(3)["tickets"])
+    results = asyncio.run(mcp_server.tool_batch([
+        {"tool": "create_tickets_bulk", "args": {"tickets": [{"customer_id": 3, "issue": "ok"}]}},
+        {"tool": "update_customer", "args": {"customer_id": 3, "data": {"status": "bogus"}}},
+    ]))
+    assert results[0]["result"]["created"]
+    assert "error" in results[1]
+    assert len(mcp_tools.get_customer_history(3)["tickets"]) == before + 1
+    assert mcp_tools.get_customer(3)["status"] in ("active", "disabled")
+
+
+def test_histogram_quantiles():
+    h = Histogram(buckets=(0.01, 0.1, 1.0))
+    for _ in range(90):
+        h.observe(0.005)
+    for _ in range(10):
+        h.observe(0.5)
+    assert h.quantile(0.5) <= 0.01
+    assert 0.1 < h.quantile(0.99) <= 0.5
+    assert list(h.cumulative())[-1] == ("+Inf", 100)
+
+
+def test_tool_metrics_snapshot_and_prometheus(tmp_path):
+    metrics = ToolMetrics(enabled=True)
+    metrics.record("list_customers", 0.002, [{"id": 1}, {"id": 2}])
+    metrics.record("list_customers", 0.004, {"error": "bad status"})
+    metrics.record("get_customer", 0.001, error="TimeoutError")
+
+    snap = metrics.snapshot()["tools"]
+    assert snap["list_customers"]["calls"] == 2
+    assert snap["list_customers"]["rows"] == 2
+    assert snap["list_customers"]["errors"] == {"ToolError": 1}
+    assert snap["get_customer"]["errors"] == {"TimeoutError": 1}
+    assert snap["list_customers"]["latency_ms"]["max"] == 4.0
+
+    path = tmp_path / "mcp.prom"
+    metrics.dump_prometheus(str(path), {"mcp_executor_queued": 0})
+    text = path.read_text()
+    assert 'mcp_tool_calls_total{tool="list_customers"} 2' in text
+    assert 'mcp_tool_latency_seconds_count{tool="get_customer"} 1' in text
+    assert "mcp_executor_queued 0" in text
+
+    disabled = ToolMetrics(enabled=False)
+    disabled.record("get_customer", 0.001, {"id": 1})
+    assert disabled.snapshot()["tools"] == {}
+
+
+def test_server_stats_reports_tool_latency():
+    mcp_server.metrics.reset()
+    asyncio.run(mcp_server.tool_get_customer(1))
+    asyncio.run(mcp_server.tool_get_customer(1, fields=["bogus"]))
+
+    asyncio.run(mcp_server.tool_stream_customer_history(999999, ctx=_FakeContext()))
+    mcp_server.tool_pool_stats()
+
+    stats = mcp_server.tool_server_stats()
+    entry = stats["tools"]["tools"]["get_customer"]
+    assert entry["calls"] == 3  # includes the stream's customer lookup
+    assert entry["rows"] == 1
+    assert entry["payload_bytes"] == len(json.dumps(mcp_server.get_customer(1))) + len("null")
+    assert sum(entry["errors"].values()) == 1
+    assert {"executor", "pool", "cache"} <= set(stats)
+    assert stats["tools"]["tools"]["stream_customer_history"]["errors"] == {"ToolError": 1}
+    assert stats["tools"]["tools"]["pool_stats"]["calls"] == 1
+    assert mcp_server.tool_server_stats()["tools"]["tools"]["server_stats"]["calls"] == 1
+
+
+def test_single_flight_shares_one_call():
+    flight = SingleFlight(enabled=True)
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"id": 1}
+
+    async def main():
+        same = [flight.do("get_customer", "1", slow) for _ in range(5)]
+        other = flight.do("get_customer", "2", slow)
+        return await asyncio.gather(*same, other)
+
+    results = asyncio.run(main())
+    assert len(calls) == 2
+    assert all(r == {"id": 1} for r in results)
+    stats = flight.stats()
+    assert stats["tools"]["get_customer"] == {"executed": 2, "coalesced": 4}
+    assert stats["in_flight"] == 0
+
+
+def test_single_flight_shares_errors_and_forget():
+    flight = SingleFlight(enabled=True)
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        first = asyncio.ensure_future(flight.do("t", "k", failing))
+        await asyncio.sleep(0)
+        flight.forget()
+        second = asyncio.ensure_future(flight.do("t", "k", failing))
+        return await asyncio.gather(first, second, return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert len(calls) == 2
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_concurrent_identical_tool_calls_are_coalesced():
+    mcp_server.flight.reset()
+
+    async def main():
+        return await asyncio.gather(*(mcp_server.tool_get_customer(1) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert all(r["id"] == 1 for r in results)
+    counters = mcp_server.tool_server_stats()["single_flight"]["tools"]["get_customer"]
+    assert counters == {"executed": 1, "coalesced": 4}
+
+
+def test_coalesced_calls_are_counted_in_tool_metrics():
+    mcp_server.flight.reset()
+    mcp_server.metrics.reset()
+
+    async def main():
+        return await asyncio.gather(*(mcp_server.tool_get_customer(1) for _ in range(5)))
+
+    asyncio.run(main())
+    stats = mcp_server.tool_server_stats()
+    assert stats["single_flight"]["tools"]["get_customer"] == {"executed": 1, "coalesced": 4}
+    entry = stats["tools"]["tools"]["get_customer"]
+    assert entry["calls"] == 5
+    assert entry["errors"] == {}
+    assert entry["rows"] == 5
+
+
+def test_tool_limit_waiters_do_not_hold_admission_slots():
+    def report():
+        time.sleep(0.2)
+        return {}
+
+    async def main():
+        reports = [asyncio.create_task(mcp_server._run("get_ticket_stats", report)) for _ in range(12)]
+        await asyncio.sleep(0.05)
+        inflight = mcp_server.admission.stats()["inflight"]
+        start = time.perf_counter()
+        await mcp_server._run("get_customer", lambda: {"id": 1})
+        waited = time.perf_counter() - start
+        await asyncio.gather(*reports)
+        return inflight, waited
+
+    inflight, waited = asyncio.run(main())
+    assert inflight == mcp_server.TOOL_CONCURRENCY["get_ticket_stats"]
+    assert waited < 0.1
+
+
+class _FakeContext:
+    """Stands in for an MCP request Context that carries a progress token."""
+
+    def __init__(self):
+        self.request_context = type("R", (), {"meta": type("M", (), {"progressToken": "t"})()})()
+        self.messages = []
+        self.held = []  # (read connections in use, admitted calls) at each send
+
+    async def report_progress(self, progress, total=None, message=None):
+        import mcp_tools
+
+        self.messages.append((progress, json.loads(message)))
+        self.held.append((mcp_tools.pool_stats()["read"]["in_use"],
+                          mcp_server.admission.stats()["inflight"]))
+
+
+def test_stream_customer_history_sends_chunks_as_progress():
+    import mcp_tools
+
+    ctx = _FakeContext()
+    res = asyncio.run(mcp_server.tool_stream_customer_history(1, chunk_size=2, ctx=ctx))
+    expected = [t["id"] for t in mcp_tools.get_customer_history(1)["tickets"]]
+
+    assert res["customer"]["id"] == 1
+    assert res["streamed"]["rows"] == len(expected)
+    assert [m["chunk"] for _, m in ctx.messages] == list(range(res["streamed"]["chunks"]))
+    assert all(len(m["rows"]) <= 2 for _, m in ctx.messages)
+    assert [t["id"] for _, m in ctx.messages for t in m["rows"]] == expected
+    assert ctx.messages[-1][0] == len(expected)
+    # Nothing is held while the client receives a chunk
+    assert set(ctx.held) == {(0, 0)}
+
+    missing = asyncio.run(mcp_server.tool_stream_customer_history(999999, ctx=_FakeContext()))
+    assert "error" in missing
+
+
+def test_stream_customers_without_progress_token_returns_first_page():
+    ctx = _FakeContext()
+    streamed = asyncio.run(mcp_server.tool_stream_customers(status="active", chunk_size=3, ctx=ctx))
+    total = sum(len(m["rows"]) for _, m in ctx.messages)
+    assert streamed["streamed"]["rows"] == total
+
+    page = asyncio.run(mcp_server.tool_stream_customers(status="active", chunk_size=3))
+    assert len(page["customers"]) == 3
+    assert page["next_cursor"]
+
+
+def test_admission_prioritises_and_sheds():
+    controller = AdmissionController(
+        max_inflight=1,
+        max_queue=2,
+        tool_priorities={"get_customer": "interactive", "get_ticket_stats": "batch"},
+    )
+    order = []
+
+    async def call(tool, hold=0.02):
+        async with controller.admit(tool):
+            order.append(tool)
+            await asyncio.sleep(hold)
+
+    async def main():
+        first = asyncio.ensure_future(call("list_customers", hold=0.05))
+        await asyncio.sleep(0)
+        queued = [asyncio.ensure_future(call("get_ticket_stats")),
+                  asyncio.ensure_future(call("list_tickets"))]
+        await asyncio.sleep(0)
+        # Queue is full: the interactive call displaces the batch waiter and
+        # a second standard call is rejected outright.
+        urgent = asyncio.ensure_future(call("get_customer"))
+        rejected = asyncio.ensure_future(call("search_tickets"))
+        return await asyncio.gather(first, *queued, urgent, rejected, return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert isinstance(results[1], Overloaded)
+    assert isinstance(results[4], Overloaded) and results[4].retry_after > 0
+    assert order == ["list_customers", "get_customer", "list_tickets"]
+
+    stats = controller.stats()
+    assert stats["inflight"] == 0 and stats["queued"] == 0
+    assert stats["classes"]["batch"]["displaced"] == 1
+    assert stats["classes"]["standard"]["rejected"] == 1
+    assert stats["classes"]["interactive"]["admitted"] == 1
+
+
+def test_admission_queue_deadline():
+    controller = AdmissionController(max_inflight=1, max_queue=4, queue_timeouts={"standard": 0.01})
+
+    async def main():
+        async with controller.admit("list_tickets"):
+            with pytest.raises(Overloaded):
+                async with controller.admit("list_tickets"):
+                    pass
+        async with controller.admit("list_tickets"):
+            pass
+
+    asyncio.run(main())
+    counters = controller.stats()["classes"]["standard"]
+    assert counters["expired"] == 1
+    assert counters["admitted"] == 2
+    assert controller.stats()["inflight"] == 0
+
+
+def test_overloaded_tool_call_returns_retry_after(monkeypatch):
+    controller = AdmissionController(max_inflight=1, max_queue=0)
+    monkeypatch.setattr(mcp_server, "admission", controller)
+
+    async def main():
+        async with controller.admit("other"):
+            return await mcp_server.tool_list_tickets(limit=1)
+
+    res = asyncio.run(main())
+    assert "overloaded" in res["error"]
+    assert res["retry_after"] > 0
+
+
+def test_multi_worker_app_is_stateless(monkeypatch):
+    import multi_worker
+
+    import mcp_tools
+
+    try:
+        app = multi_worker.create_app()
+        assert mcp_server.mcp.settings.stateless_http
+        assert any(getattr(r, "path", None) == "/mcp" for r in app.routes)
+        # Per-process read caches could not see other workers' writes
+        assert not mcp_tools.cache_stats()["enabled"]
+    finally:
+        mcp_tools.configure_cache(enabled=True)
+
+    monkeypatch.setattr(multi_worker.os, "getpid", lambda: 42)
+    assert multi_worker._worker_metrics_file("/tmp/mcp.prom") == "/tmp/mcp-42.prom"
@@ -37,3 +37,362 @@ def test_get_customer_history():
     assert "customer" in hist
     assert "tickets" in hist
     assert isinstance(hist["tickets"], list)
+
+
+def test_pool_reuses_connections():
+    import mcp_tools
+
+    mcp_tools.configure_pool()
+    for _ in range(10):
+        list_customers(limit=1)
+    stats = mcp_tools.pool_stats()["read"]
+    assert stats["created"] == 1
+    assert stats["acquired"] == 10
+    assert stats["in_use"] == 0
+
+
+def test_pool_times_out_when_exhausted():
+    import mcp_tools
+
+    mcp_tools.configure_pool(max_size=1, timeout=0.05)
+    try:
+        with mcp_tools._connection(readonly=True):
+            with pytest.raises(ToolError):
+                list_customers(limit=1)
+        assert mcp_tools.pool_stats()["read"]["timeouts"] == 1
+    finally:
+        mcp_tools.configure_pool()
+
+
+def test_wal_profile_reads_do_not_block_on_writer(tmp_path):
+    import shutil
+    import sqlite3
+
+    import mcp_tools
+
+    db = tmp_path / "support.db"
+    shutil.copy(mcp_tools._db_path(), db)
+    mcp_tools.configure_pool(db_path=db, profile="wal")
+    mcp_tools.configure_cache(enabled=False)
+    try:
+        with mcp_tools._connection() as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            # Hold an uncommitted write; WAL readers still see the old row
+            conn.execute("UPDATE customers SET name = 'pending' WHERE id = 1")
+            assert get_customer(1)["name"] != "pending"
+
+        with mcp_tools._connection(readonly=True) as conn:
+            with pytest.raises(sqlite3.OperationalError):
+                conn.execute("DELETE FROM tickets")
+
+        with pytest.raises(ToolError):
+            mcp_tools.configure_pool(db_path=db, profile="no-such-profile")
+    finally:
+        mcp_tools.configure_pool(profile="default")
+        mcp_tools.configure_cache(enabled=True)
+
+
+def test_get_customers_bulk():
+    from mcp_tools import get_customers_bulk
+
+    res = get_customers_bulk([3, 1, 3, 999999])
+    assert [c["id"] for c in res] == [3, 1]
+    assert get_customers_bulk([]) == []
+
+
+def test_get_customer_histories_bulk_matches_single():
+    from mcp_tools import get_customer_histories_bulk
+
+    res = get_customer_histories_bulk([2, 1])
+    assert [h["customer"]["id"] for h in res] == [2, 1]
+    for h in res:
+        assert h == get_customer_history(h["customer"]["id"])
+
+
+def test_list_customers_page_walks_all_rows():
+    from mcp_tools import list_customers_page
+
+    seen = []
+    cursor = None
+    while True:
+        page = list_customers_page(status="active", limit=4, cursor=cursor)
+        assert len(page["customers"]) <= 4
+        seen.extend(c["id"] for c in page["customers"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [c["id"] for c in list_customers(status="active", limit=1000)]
+
+
+def test_list_customers_page_rejects_bad_cursor():
+    from mcp_tools import _encode_cursor, list_customers_page
+
+    with pytest.raises(ToolError):
+        list_customers_page(cursor="not-a-cursor")
+
+    page = list_customers_page(status="active", limit=1)
+    with pytest.raises(ToolError):
+        list_customers_page(status="disabled", cursor=page["next_cursor"])
+
+    # Well-formed token, tampered contents
+    for state in ({"after": "x", "status": None}, {"status": None}, {"after": [1], "status": None}):
+        with pytest.raises(ToolError, match="Invalid pagination cursor"):
+            list_customers_page(cursor=_encode_cursor(state))
+
+
+def test_iter_customers_streams_everything():
+    import mcp_tools
+
+    ids = [c["id"] for c in mcp_tools.iter_customers(batch_size=2)]
+    assert ids == [c["id"] for c in list_customers(limit=1000)]
+    assert mcp_tools.pool_stats()["read"]["in_use"] == 0
+
+
+def test_cache_serves_repeat_reads_and_invalidates_on_write():
+    import mcp_tools
+
+    mcp_tools.configure_cache(enabled=True)
+    before = mcp_tools.cache_stats()
+    get_customer(2)
+    get_customer(2)
+    get_customer_history(2)
+    get_customer_history(2)
+    stats = mcp_tools.cache_stats()
+    assert stats["hits"] - before["hits"] == 2
+
+    # Mutating a returned dict must not poison the cache
+    get_customer(2)["name"] = "mutated"
+    assert get_customer(2)["name"] != "mutated"
+
+    update_customer(2, {"phone": "+1-555-9999"})
+    assert get_customer(2)["phone"] == "+1-555-9999"
+    assert get_customer_history(2)["customer"]["phone"] == "+1-555-9999"
+
+    n_tickets = len(get_customer_history(2)["tickets"])
+    create_ticket(2, "cache invalidation check", "low")
+    assert len(get_customer_history(2)["tickets"]) == n_tickets + 1
+
+
+def test_cache_lru_eviction_and_disable():
+    import mcp_tools
+
+    mcp_tools.configure_cache(max_size=2, enabled=True)
+    try:
+        for cid in (1, 2, 3):
+            get_customer(cid)
+        stats = mcp_tools.cache_stats()
+        assert stats["size"] == 2
+        assert stats["evictions"] >= 1
+
+        mcp_tools.configure_cache(enabled=False)
+        hits = mcp_tools.cache_stats()["hits"]
+        get_customer(3)
+        get_customer(3)
+        assert mcp_tools.cache_stats()["hits"] == hits
+    finally:
+        mcp_tools.configure_cache(max_size=mcp_tools.CACHE_MAX_SIZE, enabled=True)
+
+
+def test_update_customer_unknown_id():
+    with pytest.raises(ToolError):
+        update_customer(999999, {"name": "Nobody"})
+
+
+def test_create_ticket_unknown_customer():
+    with pytest.raises(ToolError):
+        create_ticket(999999, "orphan ticket", "low")
+
+
+def test_create_tickets_bulk_reports_per_row_errors():
+    from mcp_tools import create_tickets_bulk
+
+    res = create_tickets_bulk([
+        {"customer_id": 1, "issue": "bulk one", "priority": "high"},
+        {"customer_id": 999999, "issue": "unknown customer"},
+        {"customer_id": 2, "issue": "   "},
+        {"customer_id": 2, "issue": "bulk two"},
+        {"customer_id": 2, "issue": "bad priority", "priority": "urgent"},
+    ])
+    assert [t["issue"] for t in res["created"]] == ["bulk one", "bulk two"]
+    assert res["created"][1]["priority"] == "medium"
+    assert [e["index"] for e in res["errors"]] == [1, 2, 4]
+
+    history_ids = {t["id"] for t in get_customer_history(2)["tickets"]}
+    assert res["created"][1]["id"] in history_ids
+
+
+def test_get_ticket_stats_matches_histories():
+    from mcp_tools import get_ticket_stats
+
+    stats = get_ticket_stats(customer_status="active")
+    assert stats["customers"]
+    for row in stats["customers"]:
+        assert row["customer_status"] == "active"
+        tickets = get_customer_history(row["customer_id"])["tickets"]
+        assert row["total"] == len(tickets)
+        assert row["high"] == sum(t["priority"] == "high" for t in tickets)
+        assert row["open"] == sum(t["status"] == "open" for t in tickets)
+    assert stats["totals"]["total"] == sum(r["total"] for r in stats["customers"])
+
+    with pytest.raises(ToolError):
+        get_ticket_stats(customer_status="premium")
+
+
+def test_list_tickets_filters_in_sql():
+    from mcp_tools import list_tickets
+
+    res = list_tickets(status=["open", "in_progress"], priority="high",
+                       customer_status="active", limit=100)
+    assert res["next_cursor"] is None
+    for t in res["tickets"]:
+        assert t["status"] in ("open", "in_progress")
+        assert t["priority"] == "high"
+        assert t["customer_status"] == "active"
+        assert get_customer(t["customer_id"])["name"] == t["customer_name"]
+
+    assert list_tickets(created_after="2999-01-01")["tickets"] == []
+    with pytest.raises(ToolError):
+        list_tickets(created_before="yesterday")
+    # Offsets are converted to UTC, the zone of the stored timestamps
+    from mcp_tools import _as_timestamp
+    assert _as_timestamp("2024-01-01T00:00:00+05:00", "x") == "2023-12-31 19:00:00"
+    assert _as_timestamp("2024-01-01T00:00:00", "x") == "2024-01-01 00:00:00"
+    with pytest.raises(ToolError):
+        list_tickets(priority="urgent")
+
+
+def test_list_tickets_pagination():
+    from mcp_tools import list_tickets
+
+    everything = [t["id"] for t in list_tickets(status="open", limit=500)["tickets"]]
+    seen = []
+    cursor = None
+    while True:
+        page = list_tickets(status="open", limit=3, cursor=cursor)
+        seen.extend(t["id"] for t in page["tickets"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == everything == sorted(everything, reverse=True)
+
+    first = list_tickets(status="open", limit=1)
+    with pytest.raises(ToolError):
+        list_tickets(status="resolved", cursor=first["next_cursor"])
+
+    from mcp_tools import _decode_cursor, _encode_cursor
+    state = _decode_cursor(first["next_cursor"])
+    with pytest.raises(ToolError, match="Invalid pagination cursor"):
+        list_tickets(status="open", limit=1, cursor=_encode_cursor({**state, "before_id": "x"}))
+
+
+def test_transaction_groups_writes_and_rolls_back():
+    import mcp_tools
+
+    before = len(get_customer_history(4)["tickets"])
+    with pytest.raises(RuntimeError):
+        with mcp_tools.transaction():
+            create_ticket(4, "rolled back", "low")
+            raise RuntimeError("abort")
+    assert len(get_customer_history(4)["tickets"]) == before
+
+    with mcp_tools.transaction():
+        create_ticket(4, "committed", "low")
+        with pytest.raises(ToolError):
+            with mcp_tools.savepoint():
+                create_ticket(999999, "bad", "low")
+    assert len(get_customer_history(4)["tickets"]) == before + 1
+
+
+def test_transaction_reads_do_not_leak_into_cache():
+    import mcp_tools
+
+    mcp_tools.configure_cache(enabled=True)  # cold cache
+    name = get_customer(6)["name"]
+    mcp_tools.clear_cache()
+    with pytest.raises(RuntimeError):
+        with mcp_tools.transaction():
+            update_customer(6, {"name": "PHANTOM"})
+            assert get_customer(6)["name"] == "PHANTOM"
+            raise RuntimeError("abort")
+    assert get_customer(6)["name"] == name
+
+
+def test_field_projection_and_compact_format():
+    from mcp_tools import get_customers_bulk, list_customers_page, list_tickets
+
+    assert get_customer(1, fields=["name", "email"]).keys() == {"name", "email"}
+
+    compact = list_customers(limit=3, fields=["id", "name"], format="compact")
+    assert compact["columns"] == ["id", "name"]
+    assert compact["rows"] == [[c["id"], c["name"]] for c in list_customers(limit=3)]
+
+    # Columns needed internally (ordering / cursors) are not leaked
+    page = list_customers_page(limit=2, fields=["email"])
+    assert [set(c) for c in page["customers"]] == [{"email"}, {"email"}]
+    assert page["next_cursor"] is not None
+    assert [set(c) for c in get_customers_bulk([2, 1], fields=["name"])] == [{"name"}, {"name"}]
+
+    tickets = list_tickets(priority="high", fields=["issue", "customer_name"], format="compact")
+    assert tickets["tickets"]["columns"] == ["issue", "customer_name"]
+
+    with pytest.raises(ToolError):
+        list_customers(fields=["password"])
+    with pytest.raises(ToolError):
+        list_customers(format="xml")
+
+
+def test_history_projection_and_counts():
+    from mcp_tools import get_customer_histories_bulk
+
+    full = get_customer_history(2)
+    counted = get_customer_history(2, fields=["name"], ticket_fields=[])
+    assert counted == {"customer": {"name": full["customer"]["name"]},
+                       "ticket_count": len(full["tickets"])}
+
+    compact = get_customer_history(2, ticket_fields=["id", "priority"], format="compact")
+    assert compact["tickets"]["rows"] == [[t["id"], t["priority"]] for t in full["tickets"]]
+
+    bulk = get_customer_histories_bulk([2], fields=["id"], ticket_fields=["issue"])
+    assert bulk == [{"customer": {"id": 2},
+                     "tickets": [{"issue": t["issue"]} for t in full["tickets"]]}]
+    assert get_customer_histories_bulk([2], ticket_fields=[])[0]["ticket_count"] == len(full["tickets"])
+
+
+def test_empty_field_projection_is_rejected():
+    from mcp_tools import get_customer_history_page, get_customers_bulk, list_tickets
+
+    for call in (
+        lambda: list_customers(fields=[]),
+        lambda: get_customer(1, fields=[]),
+        lambda: get_customer_history(1, fields=[]),
+        lambda: get_customers_bulk([1], fields=[]),
+        lambda: list_tickets(fields=[]),
+        lambda: get_customer_history_page(1, ticket_fields=[]),
+    ):
+        with pytest.raises(ToolError, match="must name at least one"):
+            call()
+
+
+def test_history_page_matches_full_history():
+    from mcp_tools import get_customer_history_page
+
+    customer_id = 1
+    expected = [t["id"] for t in get_customer_history(customer_id)["tickets"]]
+    assert expected
+
+    seen = []
+    cursor = None
+    while True:
+        page = get_customer_history_page(customer_id, limit=2, cursor=cursor, ticket_fields=["id"])
+        assert page["customer"]["id"] == customer_id
+        assert all(set(t) == {"id"} for t in page["tickets"])
+        seen.extend(t["id"] for t in page["tickets"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == expected
+
+    with pytest.raises(ToolError):
+        get_customer_history_page(999999)
+    with pytest.raises(ToolError):
+        get_customer_history_page(2, cursor=get_customer_history_page(1, limit=1)["next_cursor"])